@@ -0,0 +1 @@
+"""Benchmarks to measure the performance of neanno's hot paths (run from the repository root, eg. python -m benchmarks.text_benchmarks)."""
@@ -0,0 +1,319 @@
+"""Generates large synthetic datasets for load tests, based on the airline_tickets sample.
+
+Run from the repository root, eg.
+
+    python -m benchmarks.generate_corpus --count 1000000 --output samples/airline_tickets/texts.large.csv
+
+The words of the sample texts are used as filler, the airline/airport gazetteers and the
+key terms of the sample are used for the annotations. The output has the same columns
+as samples/airline_tickets/texts.annotating.csv (request_id, text, categories,
+is_text_annotated), ie. it can be used as dataset/source in a copy of the sample's
+project file (csv:<path> or parquet:<path>). The texts are written in chunks, so the
+memory used does not depend on the number of texts.
+"""
+
+import argparse
+import os
+import random
+import time
+
+import pandas as pd
+
+from neanno.utils.text import get_annotation_markup, remove_all_annotations_from_text
+
+SAMPLES_DIRECTORY = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)), "../samples/airline_tickets"
+)
+ANNOTATION_TYPES_BY_TINY_TYPE = {
+    "SK": "standalone_key_term",
+    "PK": "parented_key_term",
+    "SN": "standalone_named_entity",
+    "PN": "parented_named_entity",
+}
+CATEGORIES = [
+    "Trip Planning",
+    "Service Offering/Procedure",
+    "Technology",
+    "Mileage Plan",
+    "Security",
+    "Customs/Immigration",
+    "Legal",
+    "Complaint/Feedback",
+]
+# note: airports are annotated with the entity codes of the sample's project file,
+#       prefixed by the word that usually precedes them
+AIRPORT_ENTITY_CODES = {"FROM": "from", "TO": "to", "VIA": "via", "AT": "at"}
+
+
+class Vocabulary:
+    """ The words and terms which are used to generate texts."""
+
+    def __init__(self, samples_directory):
+        raw_texts = (
+            pd.read_csv(os.path.join(samples_directory, "texts.raw.csv"))
+            .fillna("")["text"]
+            .astype(str)
+        )
+        self.filler_words = [
+            word
+            for text in raw_texts
+            for word in remove_all_annotations_from_text(text).split()
+            if "`" not in word
+        ]
+        self.airlines = (
+            pd.read_csv(os.path.join(samples_directory, "airlines.named_entities.csv"))
+            .fillna("")["term"]
+            .astype(str)
+            .tolist()
+        )
+        self.airports = (
+            pd.read_csv(
+                os.path.join(samples_directory, "airport_codes.named_entities.csv")
+            )
+            .fillna("")["term"]
+            .astype(str)
+            .tolist()
+        )
+        key_terms = pd.read_csv(
+            os.path.join(samples_directory, "default.key_terms.csv")
+        ).fillna("")
+        self.key_terms = key_terms["term"].astype(str).tolist()
+        self.parented_key_terms = [
+            (term, parent_terms if parent_terms else term.lower())
+            for (term, parent_terms) in zip(
+                key_terms["term"].astype(str), key_terms["parent_terms"].astype(str)
+            )
+        ]
+
+
+class CorpusGenerator:
+    """ Generates synthetic annotated texts."""
+
+    def __init__(
+        self,
+        vocabulary,
+        min_words=20,
+        max_words=120,
+        annotation_density=0.1,
+        annotation_types_mix=None,
+        annotated_share=0.5,
+        seed=None,
+    ):
+        self.vocabulary = vocabulary
+        self.min_words = min_words
+        self.max_words = max_words
+        self.annotation_density = annotation_density
+        self.annotation_types_mix = annotation_types_mix or {
+            "SK": 0.4,
+            "PK": 0.2,
+            "SN": 0.3,
+            "PN": 0.1,
+        }
+        self.annotated_share = annotated_share
+        self.random = random.Random(seed)
+
+    def generate_annotation(self):
+        """ Returns the markup of a random annotation (incl. a preceding word if applicable)."""
+        rnd = self.random
+        type_tiny = rnd.choices(
+            list(self.annotation_types_mix.keys()),
+            list(self.annotation_types_mix.values()),
+        )[0]
+        annotation_type = ANNOTATION_TYPES_BY_TINY_TYPE[type_tiny]
+        if type_tiny == "SK":
+            return get_annotation_markup(
+                rnd.choice(self.vocabulary.key_terms), annotation_type
+            )
+        if type_tiny == "PK":
+            term, parent_terms = rnd.choice(self.vocabulary.parented_key_terms)
+            return get_annotation_markup(
+                term, annotation_type, parent_terms=parent_terms
+            )
+        # named entities are either airlines or airports
+        if rnd.random() < 0.3:
+            term = rnd.choice(self.vocabulary.airlines)
+            return get_annotation_markup(term, annotation_type, "AIRLINE", term)
+        entity_code = rnd.choice(list(AIRPORT_ENTITY_CODES.keys()))
+        term = rnd.choice(self.vocabulary.airports)
+        return "{} {}".format(
+            AIRPORT_ENTITY_CODES[entity_code],
+            get_annotation_markup(term, annotation_type, entity_code, term),
+        )
+
+    def generate_text(self):
+        """ Returns a random annotated text."""
+        rnd = self.random
+        words = rnd.choices(
+            self.vocabulary.filler_words, k=rnd.randint(self.min_words, self.max_words)
+        )
+        annotations_count = min(
+            len(words), int(len(words) * self.annotation_density + rnd.random())
+        )
+        for position in rnd.sample(range(len(words)), annotations_count):
+            words[position] = self.generate_annotation()
+        return " ".join(words)
+
+    def generate_categories(self):
+        """ Returns 0-2 random categories (separated by |)."""
+        return "|".join(self.random.sample(CATEGORIES, self.random.randint(0, 2)))
+
+    def generate_chunk(self, first_request_id, count):
+        """ Returns a dataframe with count random texts."""
+        texts = []
+        categories = []
+        is_annotated = []
+        for _ in range(count):
+            text = self.generate_text()
+            if self.random.random() < self.annotated_share:
+                texts.append(text)
+                categories.append(self.generate_categories())
+                is_annotated.append(True)
+            else:
+                # note: texts which are not annotated yet do not have annotations
+                texts.append(remove_all_annotations_from_text(text))
+                categories.append("")
+                is_annotated.append(False)
+        return pd.DataFrame(
+            {
+                "request_id": range(first_request_id, first_request_id + count),
+                "text": texts,
+                "categories": categories,
+                "is_text_annotated": is_annotated,
+            }
+        )
+
+    def generate_chunks(self, count, chunk_size):
+        """ Yields dataframes with up to chunk_size random texts until count texts are generated."""
+        for first_index in range(0, count, chunk_size):
+            yield self.generate_chunk(first_index, min(chunk_size, count - first_index))
+
+
+def write_chunks_to_csv(chunks, file_path):
+    """ Writes the given dataframes into a single CSV file."""
+    for (index, chunk) in enumerate(chunks):
+        chunk.to_csv(
+            file_path, mode="w" if index == 0 else "a", header=index == 0, index=False
+        )
+        yield len(chunk)
+
+
+def write_chunks_to_parquet(chunks, file_path):
+    """ Writes the given dataframes into a single parquet file (requires pyarrow)."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "Writing parquet files requires pyarrow. Install it with 'pip install pyarrow' or write a CSV file instead."
+        )
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(file_path, table.schema)
+            writer.write_table(table)
+            yield len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def parse_annotation_types_mix(value):
+    """ Parses a mix like SK=0.4,PK=0.2,SN=0.3,PN=0.1 into a dict."""
+    result = {}
+    for part in value.split(","):
+        type_tiny, weight = part.split("=")
+        type_tiny = type_tiny.strip().upper()
+        if type_tiny not in ANNOTATION_TYPES_BY_TINY_TYPE:
+            raise argparse.ArgumentTypeError(
+                "Annotation type '{}' is not supported. Valid types are: {}.".format(
+                    type_tiny, ", ".join(ANNOTATION_TYPES_BY_TINY_TYPE.keys())
+                )
+            )
+        result[type_tiny] = float(weight)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generates a large synthetic dataset based on the airline_tickets sample."
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="Path of the output file. Files ending with .parquet are written as parquet, others as CSV.",
+    )
+    parser.add_argument(
+        "--count", type=int, default=1000000, help="Number of texts (default: 1000000)."
+    )
+    parser.add_argument(
+        "--min-words", type=int, default=20, help="Min. words per text (default: 20)."
+    )
+    parser.add_argument(
+        "--max-words", type=int, default=120, help="Max. words per text (default: 120)."
+    )
+    parser.add_argument(
+        "--annotation-density",
+        type=float,
+        default=0.1,
+        help="Share of the words which are annotated (default: 0.1).",
+    )
+    parser.add_argument(
+        "--annotation-types-mix",
+        type=parse_annotation_types_mix,
+        default="SK=0.4,PK=0.2,SN=0.3,PN=0.1",
+        help="Relative weights of the annotation types (default: SK=0.4,PK=0.2,SN=0.3,PN=0.1).",
+    )
+    parser.add_argument(
+        "--annotated-share",
+        type=float,
+        default=0.5,
+        help="Share of the texts which are marked as annotated (default: 0.5).",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=50000,
+        help="Number of texts which are generated and written at once (default: 50000).",
+    )
+    parser.add_argument("--seed", type=int, help="Seed to get reproducible outputs.")
+    parser.add_argument(
+        "--samples-directory",
+        default=SAMPLES_DIRECTORY,
+        help="Directory with the airline_tickets sample files.",
+    )
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(
+        Vocabulary(args.samples_directory),
+        args.min_words,
+        args.max_words,
+        args.annotation_density,
+        args.annotation_types_mix,
+        args.annotated_share,
+        args.seed,
+    )
+    write_chunks = (
+        write_chunks_to_parquet
+        if args.output.lower().endswith(".parquet")
+        else write_chunks_to_csv
+    )
+    start = time.perf_counter()
+    written_count = 0
+    for chunk_length in write_chunks(
+        generator.generate_chunks(args.count, args.chunk_size), args.output
+    ):
+        written_count += chunk_length
+        print(
+            "{} of {} texts written ({:.0f} texts/s)...".format(
+                written_count,
+                args.count,
+                written_count / (time.perf_counter() - start),
+            )
+        )
+    print("Done. Dataset written to '{}'.".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
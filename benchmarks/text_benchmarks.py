@@ -0,0 +1,429 @@
+"""Benchmarks the text helpers in neanno.utils.text.
+
+Run from the repository root:
+
+    python -m benchmarks.text_benchmarks --output text_benchmarks.json
+
+The inputs are the texts of the airline_tickets sample (scaled up) and synthetic long
+documents with varying annotation density. Besides the printed summary, a JSON report
+is written which can be compared between runs to find regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from neanno.utils import parallel
+from neanno.utils.text import (
+    annotate_text,
+    compute_categories_distribution_from_column,
+    compute_named_entities_distribution_from_column,
+    compute_term_distribution_from_column,
+    compute_term_distribution_from_text,
+    extract_annotations_as_generator,
+    extract_annotations_as_list,
+    extract_annotations_as_text,
+    get_annotation_markup,
+    parsed_annotations_cache,
+    remove_all_annotations_from_column,
+    remove_all_annotations_from_text,
+)
+
+DEFAULT_SAMPLES_FILE = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../samples/airline_tickets/texts.annotating.csv",
+)
+SYNTHETIC_ANNOTATION_DENSITIES = [0.01, 0.1, 0.3]
+SYNTHETIC_ENTITY_CODES = ["AIRLINE", "AIRPORT", "FROM", "TO", "VIA", "AIRCRAFT"]
+# number of texts for which serial and parallel execution are compared
+PARALLEL_BENCHMARK_SIZES = [5000, 20000, 50000, 200000]
+
+
+def load_sample_texts(samples_file, scale):
+    """ Loads the annotated texts and categories of the samples file and repeats them scale times."""
+    dataset = pd.read_csv(samples_file).fillna("")
+    texts = dataset["text"].astype(str).tolist() * scale
+    categories = (
+        dataset["categories"].astype(str).tolist() * scale
+        if "categories" in dataset
+        else [""] * len(texts)
+    )
+    return texts, categories
+
+
+def create_synthetic_document(plain_texts, length, annotation_density, seed):
+    """ Creates a long annotated document from the given plain texts whereby about annotation_density of the words are annotated."""
+    rnd = random.Random(seed)
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.extend(rnd.choice(plain_texts).split())
+    annotation_types = [
+        "standalone_key_term",
+        "parented_key_term",
+        "standalone_named_entity",
+        "parented_named_entity",
+    ]
+    pieces = []
+    for word in words:
+        if rnd.random() < annotation_density:
+            pieces.append(
+                get_annotation_markup(
+                    word,
+                    rnd.choice(annotation_types),
+                    rnd.choice(SYNTHETIC_ENTITY_CODES),
+                    "{}, {}".format(word.lower(), rnd.choice(words).lower()),
+                )
+            )
+        else:
+            pieces.append(word)
+    return " ".join(pieces)
+
+
+def create_inputs(samples_file, scale, synthetic_length):
+    """ Creates the inputs for the benchmarks."""
+    sample_texts, sample_categories = load_sample_texts(samples_file, scale)
+    plain_texts = [
+        remove_all_annotations_from_text(text) for text in sample_texts if text
+    ]
+    return {
+        "samples": sample_texts,
+        "samples_categories": sample_categories,
+        "synthetic": {
+            annotation_density: create_synthetic_document(
+                plain_texts, synthetic_length, annotation_density, seed=42
+            )
+            for annotation_density in SYNTHETIC_ANNOTATION_DENSITIES
+        },
+    }
+
+
+def measure(function, repeat, before_each_run=None):
+    """ Runs function repeat times and returns the durations (in seconds)."""
+    durations = []
+    for _ in range(repeat):
+        if before_each_run is not None:
+            before_each_run()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def create_benchmarks(inputs):
+    """ Returns the benchmarks as list of (name, input name, items count, function, before each run function) tuples."""
+
+    samples = inputs["samples"]
+    samples_column = pd.Series(samples)
+    categories_column = pd.Series(inputs["samples_categories"])
+    clear_cache = parsed_annotations_cache.clear
+
+    def for_each_sample(function):
+        return lambda: [function(text) for text in samples]
+
+    def annotate_samples():
+        return [
+            annotate_text(
+                remove_all_annotations_from_text(text),
+                [annotation.to_dict() for annotation in annotations],
+            )
+            for (text, annotations) in samples_annotations
+        ]
+
+    samples_annotations = [
+        (text, extract_annotations_as_list(text)) for text in samples
+    ]
+    result = [
+        (
+            "extract_annotations_as_generator",
+            "samples",
+            len(samples),
+            for_each_sample(lambda text: list(extract_annotations_as_generator(text))),
+            clear_cache,
+        ),
+        (
+            "extract_annotations_as_generator (cached)",
+            "samples",
+            len(samples),
+            for_each_sample(lambda text: list(extract_annotations_as_generator(text))),
+            None,
+        ),
+        ("annotate_text", "samples", len(samples), annotate_samples, clear_cache),
+        (
+            "remove_all_annotations_from_text",
+            "samples",
+            len(samples),
+            for_each_sample(remove_all_annotations_from_text),
+            None,
+        ),
+        (
+            "compute_term_distribution_from_text",
+            "samples",
+            len(samples),
+            for_each_sample(compute_term_distribution_from_text),
+            None,
+        ),
+        (
+            "extract_annotations_as_text",
+            "samples",
+            len(samples),
+            for_each_sample(extract_annotations_as_text),
+            clear_cache,
+        ),
+        (
+            "remove_all_annotations_from_column",
+            "samples",
+            len(samples),
+            lambda: remove_all_annotations_from_column(samples_column),
+            None,
+        ),
+        (
+            "compute_named_entities_distribution_from_column",
+            "samples",
+            len(samples),
+            lambda: compute_named_entities_distribution_from_column(samples_column),
+            None,
+        ),
+        (
+            "compute_categories_distribution_from_column",
+            "samples",
+            len(samples),
+            lambda: compute_categories_distribution_from_column(categories_column),
+            None,
+        ),
+        (
+            "compute_term_distribution_from_column",
+            "samples",
+            len(samples),
+            lambda: compute_term_distribution_from_column(samples_column),
+            None,
+        ),
+    ]
+    for annotation_density, document in inputs["synthetic"].items():
+        input_name = "synthetic (length {}, density {})".format(
+            len(document), annotation_density
+        )
+        document_annotations = [
+            annotation.to_dict() for annotation in extract_annotations_as_list(document)
+        ]
+        document_without_annotations = remove_all_annotations_from_text(document)
+        result.extend(
+            [
+                (
+                    "extract_annotations_as_generator",
+                    input_name,
+                    1,
+                    lambda document=document: list(
+                        extract_annotations_as_generator(document)
+                    ),
+                    clear_cache,
+                ),
+                (
+                    "annotate_text",
+                    input_name,
+                    1,
+                    lambda text=document_without_annotations, annotations=document_annotations: annotate_text(
+                        text, annotations
+                    ),
+                    clear_cache,
+                ),
+                (
+                    "remove_all_annotations_from_text",
+                    input_name,
+                    1,
+                    lambda document=document: remove_all_annotations_from_text(
+                        document
+                    ),
+                    None,
+                ),
+                (
+                    "compute_term_distribution_from_text",
+                    input_name,
+                    1,
+                    lambda document=document: compute_term_distribution_from_text(
+                        document
+                    ),
+                    None,
+                ),
+                (
+                    "extract_annotations_as_text",
+                    input_name,
+                    1,
+                    lambda document=document: extract_annotations_as_text(document),
+                    clear_cache,
+                ),
+            ]
+        )
+    return result
+
+
+def with_parallel_settings(function, workers_count):
+    """ Returns a function which calls function with the given number of worker processes for neanno.utils.parallel (1 = serial) and no minimum input size."""
+
+    def run():
+        previous_settings = (
+            parallel.default_workers_count,
+            parallel.default_min_items_count_for_parallel_execution,
+        )
+        parallel.default_workers_count = workers_count
+        parallel.default_min_items_count_for_parallel_execution = 0
+        try:
+            return function()
+        finally:
+            (
+                parallel.default_workers_count,
+                parallel.default_min_items_count_for_parallel_execution,
+            ) = previous_settings
+
+    return run
+
+
+def create_parallel_benchmarks(inputs, workers_count):
+    """ Returns benchmarks (see create_benchmarks) which compare the serial and the parallel execution of compute_term_distribution_from_column. Used to find parallel.default_min_items_count_for_parallel_execution."""
+
+    samples = [text for text in inputs["samples"] if text]
+    result = [
+        (
+            "parallel pool startup ({} workers)".format(workers_count),
+            "-",
+            workers_count,
+            lambda: parallel.get_pool(workers_count).map(len, [[]] * workers_count),
+            parallel.shutdown_pool,
+        )
+    ]
+    for size in PARALLEL_BENCHMARK_SIZES:
+        column = pd.Series((samples * (size // len(samples) + 1))[:size])
+        input_name = "samples ({} texts)".format(size)
+        for (mode, mode_workers_count) in [
+            ("serial", 1),
+            ("parallel, {} workers".format(workers_count), workers_count),
+        ]:
+            # note: the pool is started by the warm-up run, ie. the startup is not
+            #       measured here but in the pool startup benchmark
+            result.append(
+                (
+                    "compute_term_distribution_from_column ({})".format(mode),
+                    input_name,
+                    size,
+                    with_parallel_settings(
+                        lambda column=column: compute_term_distribution_from_column(
+                            column
+                        ),
+                        mode_workers_count,
+                    ),
+                    None,
+                )
+            )
+    return result
+
+
+def run_benchmarks(inputs, repeat, name_filter=None, parallel_workers_count=None):
+    """ Runs all benchmarks and returns their results as list of dicts. The parallel benchmarks are run only if parallel_workers_count is given."""
+    benchmarks = create_benchmarks(inputs)
+    if parallel_workers_count is not None:
+        benchmarks.extend(create_parallel_benchmarks(inputs, parallel_workers_count))
+    result = []
+    for (name, input_name, items_count, function, before_each_run) in benchmarks:
+        if name_filter and name_filter not in name:
+            continue
+        # note: one warm-up run, eg. to let the regex module compile the patterns
+        function()
+        durations = measure(function, repeat, before_each_run)
+        min_seconds = min(durations)
+        result.append(
+            {
+                "name": name,
+                "input": input_name,
+                "items": items_count,
+                "repeat": repeat,
+                "min_seconds": min_seconds,
+                "median_seconds": statistics.median(durations),
+                "mean_seconds": statistics.mean(durations),
+                "items_per_second": items_count / min_seconds if min_seconds else None,
+            }
+        )
+        print(
+            "{:<50} {:<45} min {:>9.4f}s  median {:>9.4f}s".format(
+                name, input_name, min_seconds, statistics.median(durations)
+            )
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the text helpers in neanno.utils.text."
+    )
+    parser.add_argument(
+        "--samples-file",
+        default=DEFAULT_SAMPLES_FILE,
+        help="CSV file with annotated texts (column text, optionally categories).",
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=10,
+        help="Number of times the sample texts are repeated (default: 10).",
+    )
+    parser.add_argument(
+        "--synthetic-length",
+        type=int,
+        default=200000,
+        help="Approximate length (chars) of the synthetic documents (default: 200000).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of measured runs per benchmark (default: 5).",
+    )
+    parser.add_argument(
+        "--filter", help="Runs only the benchmarks whose name contains this string."
+    )
+    parser.add_argument(
+        "--parallel-workers",
+        type=int,
+        help="Also compares serial and parallel execution with this number of worker processes (default: not compared).",
+    )
+    parser.add_argument(
+        "--output", help="Path of the JSON report (default: no report is written)."
+    )
+    args = parser.parse_args()
+
+    inputs = create_inputs(args.samples_file, args.scale, args.synthetic_length)
+    results = run_benchmarks(
+        inputs, args.repeat, args.filter, args.parallel_workers
+    )
+    if args.output:
+        report = {
+            "created": datetime.now().isoformat(),
+            "environment": {
+                "python": sys.version,
+                "platform": platform.platform(),
+                "pandas": pd.__version__,
+                "cpus": os.cpu_count(),
+            },
+            "settings": {
+                "samples_file": args.samples_file,
+                "scale": args.scale,
+                "synthetic_length": args.synthetic_length,
+                "repeat": args.repeat,
+                "filter": args.filter,
+                "parallel_workers": args.parallel_workers,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print("Report written to '{}'.".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,7 @@
 
 import sys
 
-from PyQt5 import QtCore
-from PyQt5.QtWidgets import QApplication
-
 import neanno
-from neanno.configuration.configmanager import ConfigManager
-from neanno.ui.main_window import MainWindow
 
 __version__ = "0.1"
 
@@ -15,6 +10,14 @@ __version__ = "0.1"
 def main():
     """Main function for neanno's user interface."""
 
+    # note: the user interface is imported here, not at module level, so that worker
+    #       processes (see neanno.utils.parallel) which only need eg. neanno.utils.text
+    #       do not load Qt and the other packages of the user interface
+    from PyQt5 import QtCore
+    from PyQt5.QtWidgets import QApplication
+
+    from neanno.ui.main_window import MainWindow
+
     def _print_startup_banner():
         """Prints neanno's startup banner."""
 
@@ -2,6 +2,18 @@
 
 """Is invoked when the neanno UI is started as module (python -m neanno)."""
 
+import sys
+
 import neanno
 
-neanno.main()
+# note: the guard is required because worker processes (see neanno.utils.parallel)
+#       import the main module again. for the same reason, the modules which load
+#       Qt are imported within the guard only.
+if __name__ == "__main__":
+    from neanno.cli import annotate
+
+    # run a command without user interface if one is specified, eg. python -m neanno annotate ...
+    if len(sys.argv) > 1 and sys.argv[1] == "annotate":
+        annotate.main(sys.argv[2:])
+    else:
+        neanno.main()
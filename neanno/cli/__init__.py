@@ -0,0 +1 @@
+"""Provides neanno's commands which run without the user interface (python -m neanno <command> ...)."""
@@ -0,0 +1,300 @@
+"""Pre-annotates the dataset of a project with the project's predictors without the user interface (python -m neanno annotate --project-file ...).
+
+The dataset is streamed in chunks, predicted in a pool of worker processes (optional) and written to a target location. The progress is saved after each chunk, so that an interrupted run continues where it stopped when it is started again.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import config
+
+from neanno.configuration.configmanager import ConfigManager
+from neanno.utils.dataset import DatasetLocation, DatasetManager
+from neanno.utils.parallel import map_lazily_in_parallel
+from neanno.utils.text import (
+    convert_annotated_text_to_standoff,
+    convert_standoff_to_annotated_text,
+    deserialize_standoff_annotations,
+    serialize_standoff_annotations,
+)
+
+
+def main(args=None):
+    """ Main function for the annotate command."""
+    parser = argparse.ArgumentParser(
+        prog="python -m neanno annotate",
+        description="Pre-annotates the texts of a project's dataset which are not annotated yet with the project's predictors and writes the dataset to a target location. The predicted annotations and categories are suggestions, ie. the rows stay not annotated until they are reviewed.",
+    )
+    parser.add_argument(
+        "--project-file", required=True, help="Path to the neanno project file."
+    )
+    parser.add_argument(
+        "--target",
+        help="Location to write the annotated dataset to, eg. csv:annotated.csv or parquet:annotated.parquet (written as directory of parts). Defaults to the project's dataset/target if it differs from dataset/source.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="Number of rows which are loaded, predicted and written at once.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes which predict the chunks (0 = number of CPUs). Note that each worker loads its own predictors, incl. their models.",
+    )
+    parser.add_argument(
+        "--progress-file",
+        help="File to save the progress to. Defaults to the target's path with .progress.json appended.",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the progress of a previous run and start from the beginning.",
+    )
+    args = parser.parse_args(args)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size needs to be at least 1.")
+    if args.workers < 0:
+        parser.error("--workers must not be negative.")
+
+    # load the project's settings
+    # note: the predictors are loaded by the workers, see initialize_worker
+    ConfigManager.init_headless(args.project_file, add_predictors=False)
+    target = args.target or config.dataset_target
+    if target is None or is_same_location(target, config.dataset_source):
+        parser.error(
+            "Specify a --target which differs from the dataset's source. The source is read while the target is written."
+        )
+    annotate_dataset(
+        args.project_file,
+        config.dataset_source,
+        target,
+        args.chunk_size,
+        args.workers if args.workers > 0 else None,
+        args.progress_file or "{}.progress.json".format(DatasetLocation(target).path),
+        args.restart,
+    )
+
+
+def is_same_location(location_as_string, other_location_as_string):
+    return os.path.abspath(DatasetLocation(location_as_string).path) == os.path.abspath(
+        DatasetLocation(other_location_as_string).path
+    )
+
+
+def annotate_dataset(
+    project_file_path,
+    source,
+    target,
+    chunk_size,
+    workers_count,
+    progress_file_path,
+    restart=False,
+):
+    """ Pre-annotates the dataset at source chunk by chunk and writes it to target. Continues a previous run if progress_file_path has its progress (unless restart is True)."""
+
+    # get the progress of a previous run
+    progress = None if restart else load_progress(progress_file_path)
+    if progress is not None:
+        if progress["source"] != source or progress["target"] != target:
+            raise ValueError(
+                "The progress file '{}' belongs to a run from '{}' to '{}'. Ensure that you specify the same source and target or use --restart.".format(
+                    progress_file_path, progress["source"], progress["target"]
+                )
+            )
+        if progress["is_completed"]:
+            print(
+                "The dataset has been annotated already. Use --restart to annotate it again."
+            )
+            return
+        print(
+            "Continuing a previous run after {} rows...".format(
+                progress["rows_processed"]
+            )
+        )
+    else:
+        progress = {
+            "source": source,
+            "target": target,
+            "rows_processed": 0,
+            "rows_predicted": 0,
+            "target_state": None,
+            "is_completed": False,
+        }
+
+    # annotate the chunks
+    writer = DatasetManager.create_dataset_chunks_writer(
+        target, progress["target_state"]
+    )
+    chunks = skip_rows(
+        DatasetManager.load_dataset_chunks_from_location_string(
+            source, {config.text_column: str}, chunk_size
+        ),
+        progress["rows_processed"],
+    )
+    start_time = time.time()
+    rows_processed_in_this_run = 0
+    for (annotated_chunk, rows_predicted_count) in map_lazily_in_parallel(
+        annotate_chunk, chunks, workers_count, initialize_worker, (project_file_path,)
+    ):
+        writer.write(annotated_chunk)
+        progress["rows_processed"] += len(annotated_chunk)
+        progress["rows_predicted"] += rows_predicted_count
+        progress["target_state"] = writer.get_state()
+        save_progress(progress, progress_file_path)
+        rows_processed_in_this_run += len(annotated_chunk)
+        elapsed_seconds = time.time() - start_time
+        print(
+            "{} rows processed ({} predicted), {:.1f} rows/s".format(
+                progress["rows_processed"],
+                progress["rows_predicted"],
+                rows_processed_in_this_run / elapsed_seconds
+                if elapsed_seconds > 0
+                else 0,
+            )
+        )
+    progress["is_completed"] = True
+    save_progress(progress, progress_file_path)
+    print(
+        "Done. {} rows processed ({} predicted) in {:.1f}s. Dataset written to '{}'.".format(
+            progress["rows_processed"],
+            progress["rows_predicted"],
+            time.time() - start_time,
+            target,
+        )
+    )
+
+
+def skip_rows(chunks, rows_to_skip_count):
+    """ Skips the first rows of the given chunks, eg. the rows which were processed in a previous run."""
+    for chunk in chunks:
+        if rows_to_skip_count >= len(chunk):
+            rows_to_skip_count -= len(chunk)
+            continue
+        if rows_to_skip_count > 0:
+            chunk = chunk.iloc[rows_to_skip_count:]
+            rows_to_skip_count = 0
+        yield chunk
+
+
+def load_progress(progress_file_path):
+    if not os.path.isfile(progress_file_path):
+        return None
+    with open(progress_file_path, "r") as progress_file:
+        return json.load(progress_file)
+
+
+def save_progress(progress, progress_file_path):
+    # note: the progress is written to a temporary file first, so that an interruption
+    #       does not leave a broken progress file behind
+    temporary_file_path = "{}.tmp".format(progress_file_path)
+    with open(temporary_file_path, "w") as progress_file:
+        json.dump(progress, progress_file)
+    os.replace(temporary_file_path, progress_file_path)
+
+
+def initialize_worker(project_file_path):
+    """ Loads the project's settings and predictors in a worker process."""
+    ConfigManager.init_headless(project_file_path)
+    # note: unlike the user interface, the headless mode must not predict before the
+    #       predictors' models are loaded
+    if not config.prediction_pipeline.wait_until_predictors_ready():
+        print(
+            "The models of these predictors failed to load, they predict nothing: {}".format(
+                ", ".join(
+                    predictor.name
+                    for predictor in config.prediction_pipeline.get_not_ready_predictors()
+                )
+            )
+        )
+
+
+def annotate_chunk(chunk):
+    """ Adds the predicted annotations and categories to the rows of the given chunk (dataframe) which are not annotated yet. Returns the chunk and the number of predicted rows."""
+
+    # ensure the chunk has the columns neanno needs
+    chunk = chunk.copy()
+    if config.is_annotated_column not in chunk:
+        chunk[config.is_annotated_column] = False
+    if config.annotations_storage == "standoff":
+        if config.annotations_column not in chunk:
+            DatasetManager.convert_inline_to_standoff_annotations(
+                chunk, config.text_column, config.annotations_column
+            )
+        chunk[config.annotations_column] = chunk[config.annotations_column].astype(str)
+    if config.is_categories_enabled and config.categories_column not in chunk:
+        chunk[config.categories_column] = ""
+
+    # get the rows to predict
+    rows_to_predict = [
+        row
+        for (row, is_annotated) in enumerate(chunk[config.is_annotated_column])
+        if is_annotated != True
+    ]
+    if not rows_to_predict:
+        return (chunk, 0)
+    languages = [get_language(chunk, row) for row in rows_to_predict]
+
+    # predict the categories of the rows which do not have categories yet
+    # note: like in the user interface, the categories are predicted from the texts
+    #       as they are in the dataset
+    text_column_index = chunk.columns.get_loc(config.text_column)
+    if config.is_categories_enabled:
+        categories_column_index = chunk.columns.get_loc(config.categories_column)
+        rows_to_categorize = [
+            row
+            for row in rows_to_predict
+            if not str(chunk.iat[row, categories_column_index])
+        ]
+        predicted_categories = config.prediction_pipeline.predict_text_categories_batch(
+            [chunk.iat[row, text_column_index] for row in rows_to_categorize],
+            [get_language(chunk, row) for row in rows_to_categorize],
+        )
+        for (row, categories) in zip(rows_to_categorize, predicted_categories):
+            chunk.iat[row, categories_column_index] = "|".join(categories)
+
+    # predict the annotations
+    if config.annotations_storage == "standoff":
+        annotations_column_index = chunk.columns.get_loc(config.annotations_column)
+        texts = [
+            convert_standoff_to_annotated_text(
+                chunk.iat[row, text_column_index],
+                deserialize_standoff_annotations(
+                    chunk.iat[row, annotations_column_index]
+                ),
+            )
+            for row in rows_to_predict
+        ]
+    else:
+        texts = [chunk.iat[row, text_column_index] for row in rows_to_predict]
+    annotated_texts = config.prediction_pipeline.predict_inline_annotations_batch(
+        texts, languages
+    )
+    for (row, annotated_text) in zip(rows_to_predict, annotated_texts):
+        if config.annotations_storage == "standoff":
+            text, standoff_annotations = convert_annotated_text_to_standoff(
+                annotated_text
+            )
+            chunk.iat[row, text_column_index] = text
+            chunk.iat[row, annotations_column_index] = serialize_standoff_annotations(
+                standoff_annotations
+            )
+        else:
+            chunk.iat[row, text_column_index] = annotated_text
+
+    return (chunk, len(rows_to_predict))
+
+
+def get_language(chunk, row):
+    """ Gets the language of the specified row (position) of the given chunk or the default language if it has none."""
+    if config.uses_languages and config.language_column in chunk:
+        language_candidate = str(
+            chunk.iat[row, chunk.columns.get_loc(config.language_column)]
+        )
+        if language_candidate:
+            return language_candidate
+    return config.default_language
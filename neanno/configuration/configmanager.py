@@ -35,9 +35,23 @@ class ConfigManager:
         ConfigManager.key_terms()
         # named entities-related
         ConfigManager.named_entities()
+        # prediction-related
+        ConfigManager.prediction()
         # instructions
         ConfigManager.instructions()
 
+    @staticmethod
+    def init_headless(project_file_path, add_predictors=True):
+        """ Initializes the configuration without UI, eg. to annotate datasets in batch mode. The dataset is not loaded, only its settings are read. add_predictors=False skips loading the predictors (and their models)."""
+        ConfigManager.load_config_yaml(project_file_path)
+        config.prediction_pipeline = PredictionPipeline()
+        ConfigManager.dataset_settings()
+        ConfigManager.dataset_target_settings()
+        ConfigManager.categories(add_predictors)
+        ConfigManager.key_terms(add_predictors)
+        ConfigManager.named_entities(add_predictors)
+        ConfigManager.prediction()
+
     @staticmethod
     def define_args_and_load_config_yaml():
         # define arguments
@@ -63,6 +77,10 @@ class ConfigManager:
             if args.project_file
             else ConfigManager.ask_for_project_file_path()
         )
+        ConfigManager.load_config_yaml(project_file_path)
+
+    @staticmethod
+    def load_config_yaml(project_file_path):
         print("Using project file '{}'...".format(project_file_path))
         print("")
         with open(project_file_path, "r") as config_file:
@@ -93,15 +111,30 @@ class ConfigManager:
     @staticmethod
     def dataset_source():
         print("Loading texts for annotation...")
+        ConfigManager.dataset_settings()
+        config.dataset_to_edit, config.dataset_source_friendly = DatasetManager.load_dataset_from_location_string(
+            config.dataset_source, {config.text_column: str}, "dataset/source"
+        )
+        if config.annotations_storage == "standoff":
+            if config.annotations_column not in config.dataset_to_edit:
+                # note: datasets which do not have standoff annotations yet are
+                #       converted, ie. inline annotations are moved to the new column
+                DatasetManager.convert_inline_to_standoff_annotations(
+                    config.dataset_to_edit,
+                    config.text_column,
+                    config.annotations_column,
+                )
+            config.dataset_to_edit[config.annotations_column] = config.dataset_to_edit[
+                config.annotations_column
+            ].astype(str)
+
+    @staticmethod
+    def dataset_settings():
+        config.dataset_source = ConfigManager.get_config_value("dataset/source")
         config.text_column = ConfigManager.get_config_value("dataset/text_column")
         config.is_annotated_column = ConfigManager.get_config_value(
             "dataset/is_annotated_column"
         )
-        config.dataset_to_edit, config.dataset_source_friendly = DatasetManager.load_dataset_from_location_string(
-            ConfigManager.get_config_value("dataset/source"),
-            {config.text_column: str},
-            "dataset/source",
-        )
         config.uses_languages = (
             ConfigManager.get_config_value("dataset/languages") is not None
         )
@@ -114,9 +147,20 @@ class ConfigManager:
         config.language_column = ConfigManager.get_config_value(
             "dataset/languages/column", "language"
         )
+        config.annotations_storage = ConfigManager.get_config_value(
+            "dataset/annotations_storage", "inline"
+        )
+        config.annotations_column = ConfigManager.get_config_value(
+            "dataset/annotations_column", "annotations"
+        )
+
+    @staticmethod
+    def dataset_target_settings():
+        config.dataset_target = ConfigManager.get_config_value("dataset/target")
 
     @staticmethod
     def dataset_target():
+        ConfigManager.dataset_target_settings()
         config.dataset_target_friendly = None
         if ConfigManager.has_config_value("dataset/target"):
             dataset_location = DatasetLocation(
@@ -134,7 +178,14 @@ class ConfigManager:
         )
 
     @staticmethod
-    def key_terms():
+    def dataset_target_parquet(dataset_location):
+        config.dataset_target_friendly = os.path.basename(dataset_location.path)
+        config.save_callback = lambda df: DatasetManager.save_dataset_to_parquet(
+            df, dataset_location.path
+        )
+
+    @staticmethod
+    def key_terms(add_predictors=True):
         config.key_terms_shortcut_mark_standalone = ConfigManager.get_config_value(
             "key_terms/shortcuts/standalone", "Alt+1"
         )
@@ -148,7 +199,7 @@ class ConfigManager:
             "key_terms/forecolor", "#50e6ff"
         )
         config.is_key_terms_enabled = "key_terms" in config.yaml
-        if config.is_key_terms_enabled:
+        if config.is_key_terms_enabled and add_predictors:
             ConfigManager.key_terms_predictors()
 
     @staticmethod
@@ -158,13 +209,14 @@ class ConfigManager:
             ConfigManager.add_predictors_from_predictors_node(predictors_path)
 
     @staticmethod
-    def named_entities():
+    def named_entities(add_predictors=True):
         config.named_entity_definitions = []
         config.named_entity_codes = []
         config.is_named_entities_enabled = "named_entities" in config.yaml
         if config.is_named_entities_enabled:
             ConfigManager.named_entities_definitions()
-            ConfigManager.named_entities_predictors()
+            if add_predictors:
+                ConfigManager.named_entities_predictors()
 
     @staticmethod
     def named_entities_definitions():
@@ -206,7 +258,7 @@ class ConfigManager:
             ConfigManager.add_predictors_from_predictors_node(predictors_path)
 
     @staticmethod
-    def categories():
+    def categories(add_predictors=True):
         config.category_definitions = []
         config.categories_names_list = []
         config.is_categories_enabled = "categories" in config.yaml
@@ -221,7 +273,8 @@ class ConfigManager:
                 definition.name for definition in config.category_definitions
             ]
             config.categories_count = len(config.category_definitions)
-            ConfigManager.categories_predictors()
+            if add_predictors:
+                ConfigManager.categories_predictors()
 
     @staticmethod
     def categories_predictors():
@@ -229,6 +282,35 @@ class ConfigManager:
         if ConfigManager.has_config_value(predictors_path):
             ConfigManager.add_predictors_from_predictors_node(predictors_path)
 
+    @staticmethod
+    def prediction():
+        config.prediction_prefetch_rows_count = ConfigManager.get_config_value(
+            "prediction/prefetch_rows_count", 3
+        )
+        config.prediction_cache_size = ConfigManager.get_config_value(
+            "prediction/cache_size", 1024
+        )
+        config.prediction_pipeline.set_predictions_cache_size(
+            config.prediction_cache_size
+        )
+        if ConfigManager.get_config_value(
+            "prediction/is_concurrent_prediction_enabled", False
+        ):
+            config.prediction_pipeline.enable_concurrent_prediction(
+                ConfigManager.get_config_value(
+                    "prediction/concurrent_prediction_workers_count"
+                ),
+                ConfigManager.get_config_value("prediction/predictor_timeout_seconds"),
+            )
+        if ConfigManager.get_config_value(
+            "prediction/is_training_in_processes_enabled", False
+        ):
+            config.prediction_pipeline.enable_training_in_processes()
+        if ConfigManager.has_config_value("prediction/profile_file"):
+            config.prediction_pipeline.get_predictor_stats().enable_profiling(
+                ConfigManager.get_config_value("prediction/profile_file")
+            )
+
     @staticmethod
     def instructions():
         config.has_instructions = "instructions" in config.yaml
@@ -4,12 +4,29 @@ import re
 import string
 
 import config
+import numpy as np
+from collections import Counter
+
 from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QVariant, pyqtSignal
 
+from neanno.prediction.prefetcher import (
+    INLINE_ANNOTATIONS,
+    TEXT_CATEGORIES,
+    PredictionsPrefetcher,
+)
+from neanno.utils.dict import add_dict_numbers, subtract_dict_numbers
+from neanno.utils.list import get_set_of_list_and_keep_sequence
 from neanno.utils.text import (
     compute_categories_distribution_from_column,
     compute_named_entities_distribution_from_column,
-    remove_all_annotations_from_text
+    compute_named_entities_distribution_from_standoff,
+    compute_named_entities_distribution_from_standoff_column,
+    compute_named_entities_distribution_from_text,
+    convert_annotated_text_to_standoff,
+    convert_standoff_to_annotated_text,
+    deserialize_standoff_annotations,
+    remove_all_annotations_from_column,
+    serialize_standoff_annotations,
 )
 
 from sklearn.model_selection import train_test_split
@@ -22,11 +39,17 @@ class TextModel(QAbstractTableModel):
     random_categories_column_name = None
     named_entity_distribution = {}
     category_distribution = {}
+    # note: the contributions of single rows (by row position) to the distributions
+    #       above. they are recorded on demand so that edits only need to apply the
+    #       difference between a row's old and new contribution to the distributions.
+    named_entity_distribution_contributions = {}
+    category_distribution_contributions = {}
     saveStarted = pyqtSignal()
     saveCompleted = pyqtSignal()
     trainset = None
     testset = None
     test_size = None
+    predictions_prefetcher = None
 
     def __init__(self):
         super().__init__(parent=None)
@@ -74,22 +97,113 @@ class TextModel(QAbstractTableModel):
         self.is_annotated_column_index = config.dataset_to_edit.columns.get_loc(
             config.is_annotated_column
         )
+        # standoff annotations (if used)
+        # note: in standoff mode, the text column holds the plain texts and the
+        #       annotations are kept in a separate column. the inline annotations are
+        #       only generated for the editor (see data).
+        self.is_standoff_storage = config.annotations_storage == "standoff"
+        if self.is_standoff_storage:
+            self.annotations_column_index = config.dataset_to_edit.columns.get_loc(
+                config.annotations_column
+            )
 
         # compute distributions
         self.recompute_distributions()
 
+        # prefetching of predictions
+        # note: the predictions for the rows which are likely shown next are done in
+        #       the background, so navigating does not have to wait for them
+        if config.prediction_prefetch_rows_count > 0:
+            self.predictions_prefetcher = PredictionsPrefetcher(
+                config.prediction_pipeline
+            )
+
     def compute_named_entities_distribution(self):
+        self.named_entity_distribution_contributions = {}
         if config.is_named_entities_enabled:
-            self.named_entity_distribution = compute_named_entities_distribution_from_column(
-                self.get_annotated_data()[config.text_column]
-            )
+            if self.is_standoff_storage:
+                self.named_entity_distribution = compute_named_entities_distribution_from_standoff_column(
+                    self.get_annotated_data()[config.annotations_column]
+                )
+            else:
+                self.named_entity_distribution = compute_named_entities_distribution_from_column(
+                    self.get_annotated_data()[config.text_column]
+                )
 
     def compute_categories_distribution(self):
+        self.category_distribution_contributions = {}
         if config.is_categories_enabled:
             self.category_distribution = compute_categories_distribution_from_column(
                 self.get_annotated_data()[config.categories_column]
             )
 
+    def get_named_entities_distribution_contribution(self, row):
+        """ Gets the contribution of the specified row to the named entities distribution."""
+        if row not in self.named_entity_distribution_contributions:
+            if config.dataset_to_edit.iat[row, self.is_annotated_column_index] != True:
+                contribution = {}
+            elif self.is_standoff_storage:
+                contribution = compute_named_entities_distribution_from_standoff(
+                    config.dataset_to_edit.iat[row, self.annotations_column_index]
+                )
+            else:
+                contribution = compute_named_entities_distribution_from_text(
+                    str(config.dataset_to_edit.iat[row, self.text_column_index])
+                )
+            self.named_entity_distribution_contributions[row] = contribution
+        return self.named_entity_distribution_contributions[row]
+
+    def get_categories_distribution_contribution(self, row):
+        """ Gets the contribution of the specified row to the categories distribution."""
+        if row not in self.category_distribution_contributions:
+            self.category_distribution_contributions[row] = (
+                Counter(
+                    str(
+                        config.dataset_to_edit.iat[row, self.categories_column_index]
+                    ).split("|")
+                )
+                if config.dataset_to_edit.iat[row, self.is_annotated_column_index]
+                == True
+                else {}
+            )
+        return self.category_distribution_contributions[row]
+
+    def update_distributions_for_row(self, row, change_row_function):
+        """ Changes a row with the given function and updates the distributions by the difference of the row's old and new contribution."""
+
+        # get the row's contributions before the change
+        if config.is_named_entities_enabled:
+            old_named_entities_contribution = self.get_named_entities_distribution_contribution(
+                row
+            )
+        if config.is_categories_enabled:
+            old_categories_contribution = self.get_categories_distribution_contribution(
+                row
+            )
+
+        # change the row
+        change_row_function()
+        self.named_entity_distribution_contributions.pop(row, None)
+        self.category_distribution_contributions.pop(row, None)
+
+        # apply the differences
+        if config.is_named_entities_enabled:
+            subtract_dict_numbers(
+                self.named_entity_distribution, old_named_entities_contribution
+            )
+            add_dict_numbers(
+                self.named_entity_distribution,
+                self.get_named_entities_distribution_contribution(row),
+            )
+        if config.is_categories_enabled:
+            subtract_dict_numbers(
+                self.category_distribution, old_categories_contribution
+            )
+            add_dict_numbers(
+                self.category_distribution,
+                self.get_categories_distribution_contribution(row),
+            )
+
     def get_annotated_data(self):
         return config.dataset_to_edit[
             config.dataset_to_edit[config.is_annotated_column] == True
@@ -108,25 +222,15 @@ class TextModel(QAbstractTableModel):
         # return data for respective columns
         # column 0: language
         if index.column() == 0:
-            language_candidate = str(
-                config.dataset_to_edit.iloc[index.row(), self.language_column_index]
-            )
-            if language_candidate:
-                return language_candidate
-            else:
-                return config.default_language
+            return self.get_language(index.row())
         # column 1: text
         if index.column() == 1:
             # get text from dataset
-            result = str(
-                config.dataset_to_edit.iloc[index.row(), self.text_column_index]
-            )
+            result = self.get_annotated_text(index.row())
             # add predicted/suggested annotations if not annotated yet
             if not is_annotated:
                 language = self.data(index.siblingAtColumn(0))
-                result = config.prediction_pipeline.predict_inline_annotations(
-                    result, language
-                )
+                result = self.predict_inline_annotations(result, language)
             # return result
             return result
         # column 2: categories
@@ -138,7 +242,7 @@ class TextModel(QAbstractTableModel):
                 # predicted categories if not annotated yet
                 language = self.data(index.siblingAtColumn(0))
                 return "|".join(
-                    config.prediction_pipeline.predict_text_categories(
+                    self.predict_text_categories(
                         str(
                             config.dataset_to_edit.iloc[
                                 index.row(), self.text_column_index
@@ -158,27 +262,45 @@ class TextModel(QAbstractTableModel):
         row = index.row()
         col = index.column()
 
-        # update the corresponding cell in the dataset
-        # language
-        if index.column() == 0:
-            config.dataset_to_edit.iat[row, self.language_column_index] = value
-        # text
+        def update_row():
+            # update the corresponding cell in the dataset
+            # language
+            if index.column() == 0:
+                config.dataset_to_edit.iat[row, self.language_column_index] = value
+            # text
+            if index.column() == 1:
+                if self.is_standoff_storage:
+                    text, standoff_annotations = convert_annotated_text_to_standoff(
+                        value
+                    )
+                    config.dataset_to_edit.iat[row, self.text_column_index] = text
+                    config.dataset_to_edit.iat[
+                        row, self.annotations_column_index
+                    ] = serialize_standoff_annotations(standoff_annotations)
+                else:
+                    config.dataset_to_edit.iat[row, self.text_column_index] = value
+            # categories
+            if index.column() == 2:
+                config.dataset_to_edit.iat[row, self.categories_column_index] = value
+
+            # set is annotated flag to true
+            config.dataset_to_edit.iat[row, self.is_annotated_column_index] = True
+
+        # update the row and the distributions
+        # note: only the row's difference is applied to the distributions instead of
+        #       re-computing them from the whole dataset
+        self.update_distributions_for_row(row, update_row)
+
+        # train the predictors from the new text
         if index.column() == 1:
-            config.dataset_to_edit.iat[row, self.text_column_index] = value
             language = self.data(index.siblingAtColumn(0))
             config.prediction_pipeline.train_from_annotated_text(value, language)
-        # categories
-        if index.column() == 2:
-            config.dataset_to_edit.iat[row, self.categories_column_index] = value
-
-        # set is annotated flag to true
-        config.dataset_to_edit.iat[row, self.is_annotated_column_index] = True
-
-        # re-compute distributions
-        if index.column() == 1:
-            self.compute_named_entities_distribution()
-        if index.column() == 2:
-            self.compute_categories_distribution()
+            # note: the predictions done so far may not include what was just learned
+            if any(
+                predictor.is_online_training_enabled
+                for predictor in config.prediction_pipeline.get_all_prediction_enabled_predictors()
+            ):
+                self.invalidate_predictions()
 
         # save the dataset and emit a dataChanged signal
         if index.column() == 3:
@@ -188,6 +310,100 @@ class TextModel(QAbstractTableModel):
         # return true
         return True
 
+    def get_language(self, row):
+        """ Gets the language of the specified row or the default language if it has none."""
+        language_candidate = str(
+            config.dataset_to_edit.iloc[row, self.language_column_index]
+        )
+        if language_candidate:
+            return language_candidate
+        else:
+            return config.default_language
+
+    def predict_inline_annotations(self, text, language):
+        """ Predicts the inline annotations of the given text (prefetched if available)."""
+        if self.predictions_prefetcher is not None:
+            return self.predictions_prefetcher.get_inline_annotations(text, language)
+        return config.prediction_pipeline.predict_inline_annotations(text, language)
+
+    def predict_text_categories(self, text, language):
+        """ Predicts the categories of the given text (prefetched if available)."""
+        if self.predictions_prefetcher is not None:
+            return self.predictions_prefetcher.get_text_categories(text, language)
+        return config.prediction_pipeline.predict_text_categories(text, language)
+
+    def get_prediction_requests_for_row(self, row):
+        """ Gets the (kind, text, language) tuples of the predictions which data() needs to show the specified row."""
+        result = []
+        language = self.get_language(row)
+        if not config.dataset_to_edit.iat[row, self.is_annotated_column_index]:
+            result.append((INLINE_ANNOTATIONS, self.get_annotated_text(row), language))
+        if not str(config.dataset_to_edit.iat[row, self.categories_column_index]):
+            result.append(
+                (
+                    TEXT_CATEGORIES,
+                    str(config.dataset_to_edit.iat[row, self.text_column_index]),
+                    language,
+                )
+            )
+        return result
+
+    def get_rows_to_prefetch(self, current_row, backward_stack, forward_stack):
+        """ Gets the rows which are likely shown after the current row, most likely first."""
+        result = []
+        # next best row after the current row is submitted
+        not_annotated_rows = np.flatnonzero(
+            config.dataset_to_edit[config.is_annotated_column].values != True
+        )[:2]
+        result.extend(row for row in not_annotated_rows if row != current_row)
+        # rows where backward/forward navigation goes to
+        result.extend(backward_stack[-1:])
+        result.extend(forward_stack[-1:])
+        # next rows
+        next_row = current_row
+        for _ in range(config.prediction_prefetch_rows_count):
+            next_row = self.get_next_row_index(next_row)
+            result.append(next_row)
+        return [
+            row
+            for row in get_set_of_list_and_keep_sequence(int(row) for row in result)
+            if 0 <= row < self.rowCount() and row != current_row
+        ]
+
+    def prefetch_predictions(self, current_row, backward_stack=[], forward_stack=[]):
+        """ Starts predicting the rows which are likely shown after the current row in the background."""
+        if self.predictions_prefetcher is None or current_row < 0:
+            return
+        requests = []
+        for row in self.get_rows_to_prefetch(
+            current_row, backward_stack, forward_stack
+        ):
+            requests.extend(self.get_prediction_requests_for_row(row))
+        self.predictions_prefetcher.prefetch(requests)
+
+    def invalidate_predictions(self):
+        """ Drops all prefetched predictions, eg. after the predictors have changed."""
+        if self.predictions_prefetcher is not None:
+            self.predictions_prefetcher.invalidate()
+
+    def shutdown_predictions_prefetcher(self):
+        """ Stops prefetching predictions, eg. when the annotation window is closed."""
+        if self.predictions_prefetcher is not None:
+            self.predictions_prefetcher.shutdown()
+            self.predictions_prefetcher = None
+
+    def get_annotated_text(self, row):
+        """ Gets the text of the specified row incl. its (inline) annotations."""
+        text = str(config.dataset_to_edit.iat[row, self.text_column_index])
+        if self.is_standoff_storage:
+            return convert_standoff_to_annotated_text(
+                text,
+                deserialize_standoff_annotations(
+                    config.dataset_to_edit.iat[row, self.annotations_column_index]
+                ),
+            )
+        return text
+
     def headerData(self, section, orientation, role=Qt.DisplayRole):
         if section == 0:
             return config.language_column
@@ -261,14 +477,24 @@ class TextModel(QAbstractTableModel):
         return False in config.dataset_to_edit[config.is_annotated_column].values
 
     def unset_is_annotated_for_index(self, row_index):
-        config.dataset_to_edit.iloc[row_index, self.is_annotated_column_index] = False
+        def unset_is_annotated():
+            config.dataset_to_edit.iloc[
+                row_index, self.is_annotated_column_index
+            ] = False
+
+        self.update_distributions_for_row(row_index, unset_is_annotated)
 
     def remove_all_annotations_from_dataset(self):
         config.dataset_to_edit[config.is_annotated_column] = False
         config.dataset_to_edit[config.categories_column] = ""
-        config.dataset_to_edit[config.text_column] = config.dataset_to_edit[
-            config.text_column
-        ].apply(lambda text: remove_all_annotations_from_text(text))
+        if self.is_standoff_storage:
+            config.dataset_to_edit[
+                config.annotations_column
+            ] = serialize_standoff_annotations([])
+        else:
+            config.dataset_to_edit[config.text_column] = remove_all_annotations_from_column(
+                config.dataset_to_edit[config.text_column]
+            )
         self.recompute_distributions()
         self.save()
 
@@ -281,8 +507,24 @@ class TextModel(QAbstractTableModel):
         self.compute_categories_distribution()
         self.compute_named_entities_distribution()
 
+    def get_annotated_data_with_inline_annotations(self):
+        """ Gets the annotated data whereby the texts include their annotations as inline markup (also in standoff mode)."""
+        result = self.get_annotated_data()
+        if self.is_standoff_storage:
+            result = result.copy()
+            result[config.text_column] = [
+                convert_standoff_to_annotated_text(
+                    text, deserialize_standoff_annotations(standoff_annotations)
+                )
+                for (text, standoff_annotations) in zip(
+                    result[config.text_column], result[config.annotations_column]
+                )
+            ]
+        return result
+
     def get_trainset(self, test_size=0.25):
-        annotated_data = self.get_annotated_data()
+        # note: predictors expect the annotations inline
+        annotated_data = self.get_annotated_data_with_inline_annotations()
         self.test_size = test_size
         self.trainset, self.testset = train_test_split(
             annotated_data, train_size=(1 - test_size), test_size=self.test_size
@@ -6,7 +6,15 @@ import torch
 import yaml
 from spacy.util import compounding, minibatch
 
+from neanno.prediction.model_loading import BackgroundModelLoader
 from neanno.prediction.predictor import CategoriesPredictor
+from neanno.prediction.spacy_models import (
+    acquire_spacy_model,
+    copy_spacy_model_sharing_vocab,
+    load_spacy_model_sharing_vocab,
+    release_spacy_model,
+    save_spacy_model_without_vocab,
+)
 from neanno.utils.list import is_majority_of_last_n_items_decreasing
 from neanno.utils.signals import *
 from neanno.utils.text import remove_all_annotations_from_text
@@ -18,8 +26,11 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
     source_model = None
     target_model_directory = None
     target_model_name = None
-    spacy_model = None
+    spacy_model_loader = None
     is_using_gpu = None
+    batch_size = 256
+    is_loading_model_in_background = True
+    is_source_model_acquired = False
 
     def __init__(self, predictor_config):
         super().__init__(predictor_config)
@@ -34,11 +45,54 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
             self.target_model_directory = predictor_config["target_model_directory"]
         if "target_model_name" in predictor_config:
             self.target_model_name = predictor_config["target_model_name"]
-        self.spacy_model = (
-            spacy.blank(self.source_model.replace("blank:", "", 1))
-            if self.source_model.startswith("blank:")
-            else spacy.load(self.source_model)
+        if "batch_size" in predictor_config:
+            self.batch_size = predictor_config["batch_size"]
+        if "is_loading_model_in_background" in predictor_config:
+            self.is_loading_model_in_background = predictor_config[
+                "is_loading_model_in_background"
+            ]
+        # note: the model is loaded in the background by default, so neanno can start
+        #       without waiting for it. until it is loaded, the predictor predicts
+        #       nothing. the model version is bumped once it is loaded.
+        self.spacy_model_loader = BackgroundModelLoader(
+            self.load_source_model,
+            self.bump_model_version,
+            self.is_loading_model_in_background,
+        )
+
+    def load_source_model(self):
+        """ Loads the spacy model specified by source_model."""
+        # note: the source model is loaded only once per process and its vocab incl.
+        #       the vectors is shared with the other predictors using the same source
+        #       model. the pipes of this predictor are its own.
+        source_model = acquire_spacy_model(self.source_model)
+        self.is_source_model_acquired = True
+        result = copy_spacy_model_sharing_vocab(source_model)
+        print(
+            "Loaded model '{}' of predictor '{}'.".format(self.source_model, self.name)
         )
+        return result
+
+    def unload(self):
+        if self.is_source_model_acquired:
+            self.is_source_model_acquired = False
+            release_spacy_model(self.source_model)
+
+    @property
+    def spacy_model(self):
+        """ The spacy model or None if it is not loaded (yet)."""
+        return self.spacy_model_loader.get_model()
+
+    @spacy_model.setter
+    def spacy_model(self, value):
+        self.spacy_model_loader.set_model(value)
+
+    @property
+    def readiness(self):
+        return self.spacy_model_loader.state
+
+    def wait_until_ready(self, timeout=None):
+        return self.spacy_model_loader.get_model(timeout) is not None
 
     @property
     def supports_online_training(self):
@@ -48,6 +102,16 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
     def supports_batch_training(self):
         return True
 
+    @property
+    def supports_training_in_process(self):
+        return True
+
+    def save_model(self, directory):
+        save_spacy_model_without_vocab(self.spacy_model, directory)
+
+    def load_model(self, directory):
+        self.spacy_model = load_spacy_model_sharing_vocab(directory, self.spacy_model)
+
     @property
     def project_config_validation_schema_custom_part(self):
         return yaml.load(
@@ -61,6 +125,13 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
             target_model_name:
                 type: string
                 required: False
+            batch_size:
+                type: integer
+                required: False
+                min: 1
+            is_loading_model_in_background:
+                type: boolean
+                required: False
             """,
             Loader=yaml.FullLoader,
         )
@@ -78,11 +149,18 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
     ):
         """ Trains the model from the given trainset."""
 
+        # wait until the source model is loaded
+        self.wait_until_ready()
+
+        # note: a copy of the model is trained, so the model in use is only replaced
+        #       if the training is completed, ie. not cancelled
+        spacy_model = copy_spacy_model_sharing_vocab(self.spacy_model)
+
         # ensure and get the textcat pipe from the spacy model
-        if "textcat" not in self.spacy_model.pipe_names:
-            textcat_pipe = self.spacy_model.create_pipe("textcat")
-            self.spacy_model.add_pipe(textcat_pipe, last=True)
-        textcat_pipe = self.spacy_model.get_pipe("textcat")
+        if "textcat" not in spacy_model.pipe_names:
+            textcat_pipe = spacy_model.create_pipe("textcat")
+            spacy_model.add_pipe(textcat_pipe, last=True)
+        textcat_pipe = spacy_model.get_pipe("textcat")
 
         # ensure we have all categories in the model
         for category_to_train in categories_to_train:
@@ -109,12 +187,15 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
 
         max_iterations = 100
         other_pipes = [
-            pipe for pipe in self.spacy_model.pipe_names if pipe != "textcat"
+            pipe for pipe in spacy_model.pipe_names if pipe != "textcat"
         ]
         iteration_losses = []
-        with self.spacy_model.disable_pipes(*other_pipes):
-            optimizer = self.spacy_model.begin_training()
+        with spacy_model.disable_pipes(*other_pipes):
+            optimizer = spacy_model.begin_training()
             for iteration in range(max_iterations):
+                # stop training if the job has been cancelled
+                if is_cancellation_requested(signals):
+                    break
                 emit_partial_message("Iteration {}...".format(iteration), signals)
                 losses = {}
                 batches = minibatch(
@@ -122,7 +203,7 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
                 )
                 for batch in batches:
                     texts, annotations = zip(*batch)
-                    self.spacy_model.update(
+                    spacy_model.update(
                         texts, annotations, sgd=optimizer, drop=0.2, losses=losses
                     )
                 iteration_loss = losses["textcat"]
@@ -138,14 +219,21 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
                 ):
                     break
 
+        # keep the previous model if the training has been cancelled
+        if is_cancellation_requested(signals):
+            emit_message("Training cancelled, the previous model is kept.", signals)
+            emit_new_line(signals)
+            return
+        self.spacy_model = spacy_model
+
         # save model to output directory
         if self.target_model_directory is not None:
             output_dir = pathlib.Path(self.target_model_directory)
             emit_message("Saving model to folder '{}'...".format(output_dir), signals)
             if not output_dir.exists():
                 output_dir.mkdir()
-            self.spacy_model.meta["name"] = self.target_model_name
-            self.spacy_model.to_disk(output_dir)
+            spacy_model.meta["name"] = self.target_model_name
+            spacy_model.to_disk(output_dir)
 
         # compute and tell training times
         emit_end_time_duration(start_time, "Training", signals)
@@ -158,8 +246,25 @@ class FromSpacyCategoriesPredictor(CategoriesPredictor):
 
         if self.spacy_model:
             doc = self.spacy_model(remove_all_annotations_from_text(text))
+            return self.get_text_categories_from_doc(doc)
+        else:
+            return []
+
+    def predict_text_categories_batch(self, texts, languages=None):
+        """Predicts the text categories of the given texts (in batches)."""
+
+        texts = list(texts)
+        if self.spacy_model:
             return [
-                category for category in doc.cats.keys() if doc.cats[category] >= 0.5
+                self.get_text_categories_from_doc(doc)
+                for doc in self.spacy_model.pipe(
+                    [remove_all_annotations_from_text(text) for text in texts],
+                    batch_size=self.batch_size,
+                )
             ]
         else:
-            return []
+            return [[] for _ in texts]
+
+    def get_text_categories_from_doc(self, doc):
+        """Returns the text categories of the given (spacy) doc."""
+        return [category for category in doc.cats.keys() if doc.cats[category] >= 0.5]
@@ -5,7 +5,10 @@ from flashtext import KeywordProcessor
 from neanno.prediction.predictor import KeyTermsPredictor
 from neanno.utils.dataset import DatasetManager
 from neanno.utils.dict import merge_dict
-from neanno.utils.text import extract_annotations_as_generator
+from neanno.utils.text import (
+    convert_markup_to_standoff_annotation,
+    extract_annotations_as_generator,
+)
 
 
 class FromDatasetKeyTermsPredictor(KeyTermsPredictor):
@@ -171,3 +174,14 @@ class FromDatasetKeyTermsPredictor(KeyTermsPredictor):
             if self.flashtext is not None
             else text
         )
+
+    def predict_inline_annotation_spans(self, text, language="en-US"):
+        # note: flashtext's clean names are the annotations' markups
+        if self.flashtext is None:
+            return []
+        return [
+            convert_markup_to_standoff_annotation(annotation_markup, start, end)
+            for (annotation_markup, start, end) in self.flashtext.extract_keywords(
+                text, span_info=True
+            )
+        ]
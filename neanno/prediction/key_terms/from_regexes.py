@@ -3,6 +3,7 @@ import re
 import yaml
 
 from neanno.prediction.predictor import KeyTermsPredictor
+from neanno.utils.text import remove_overlapping_standoff_annotations
 
 
 class FromRegexesKeyTermsPredictor(KeyTermsPredictor):
@@ -53,9 +54,11 @@ class FromRegexesKeyTermsPredictor(KeyTermsPredictor):
 
     def add_pattern_definition(self, name, pattern, parent_terms):
         self.pattern_definitions[name] = PatternDefinition(name, pattern, parent_terms)
+        self.bump_model_version()
 
     def remove_pattern_definition(self, name):
         del self.pattern_definitions[name]
+        self.bump_model_version()
 
     def predict_inline_annotations(self, text, language="en-US"):
         result = text
@@ -75,6 +78,25 @@ class FromRegexesKeyTermsPredictor(KeyTermsPredictor):
                 )
         return result
 
+    def predict_inline_annotation_spans(self, text, language="en-US"):
+        spans = []
+        for name in self.pattern_definitions:
+            pattern_definition = self.pattern_definitions[name]
+            for match in re.finditer(pattern_definition.pattern, text):
+                if match.start() == match.end():
+                    continue
+                spans.append(
+                    [
+                        match.start(),
+                        match.end(),
+                        "PK" if pattern_definition.parent_terms else "SK",
+                        None,
+                        pattern_definition.parent_terms or None,
+                    ]
+                )
+        # note: matches which overlap with a match of a preceding pattern are dropped
+        return remove_overlapping_standoff_annotations(spans)
+
 
 class PatternDefinition:
     """ Defines a regex pattern for predicting key terms."""
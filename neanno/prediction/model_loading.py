@@ -0,0 +1,70 @@
+"""Loads the models of predictors in the background, so that neanno does not have to wait for them at startup."""
+
+import threading
+import traceback
+
+# note: these are the states of a loader as well as the readiness of a predictor (see
+#       Predictor.readiness)
+READY = "ready"
+LOADING = "loading"
+FAILED = "failed"
+
+
+class BackgroundModelLoader:
+    """ Loads a model with the given load function in a background thread (or right away if in_background is False). on_loaded is called after the model has been loaded, eg. to bump the model version of the predictor."""
+
+    def __init__(self, load_function, on_loaded=None, in_background=True):
+        self._model = None
+        self._exception = None
+        self._state = LOADING
+        self._lock = threading.Lock()
+        self._loaded_event = threading.Event()
+        if in_background:
+            threading.Thread(
+                target=self._load, args=(load_function, on_loaded), daemon=True
+            ).start()
+        else:
+            self._load(load_function, on_loaded)
+            if self._exception is not None:
+                raise self._exception
+
+    def _load(self, load_function, on_loaded):
+        try:
+            model = load_function()
+        except Exception as exception:
+            if self._loaded_event.is_set():
+                return
+            traceback.print_exc()
+            with self._lock:
+                self._exception = exception
+                self._state = FAILED
+            self._loaded_event.set()
+            return
+        with self._lock:
+            # note: a model which has been set in the meantime (see set_model) is newer
+            #       than the loaded one, so the loaded one is dropped
+            if self._loaded_event.is_set():
+                return
+            self._model = model
+            self._state = READY
+        self._loaded_event.set()
+        if on_loaded is not None:
+            on_loaded()
+
+    @property
+    def state(self):
+        """ The loader's state, ie. LOADING, READY or FAILED."""
+        return self._state
+
+    def get_model(self, timeout=0):
+        """ Returns the model or None if it is not loaded within timeout seconds (None = wait until loaded) or failed to load."""
+        self._loaded_event.wait(timeout)
+        return self._model
+
+    def set_model(self, model):
+        """ Replaces the model, eg. after it has been trained elsewhere."""
+        with self._lock:
+            self._model = model
+            self._exception = None
+            self._state = READY
+        self._loaded_event.set()
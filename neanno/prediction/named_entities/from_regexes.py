@@ -3,6 +3,7 @@ import re
 import yaml
 
 from neanno.prediction.predictor import NamedEntitiesPredictor
+from neanno.utils.text import remove_overlapping_standoff_annotations
 
 
 class FromRegexesNamedEntitiesPredictor(NamedEntitiesPredictor):
@@ -55,9 +56,11 @@ class FromRegexesNamedEntitiesPredictor(NamedEntitiesPredictor):
         self.pattern_definitions[entity_code] = PatternDefinition(
             entity_code, pattern, parent_terms
         )
+        self.bump_model_version()
 
     def remove_pattern_definition(self, entity_code):
         del self.pattern_definitions[entity_code]
+        self.bump_model_version()
 
     def predict_inline_annotations(self, text, language="en-US"):
         result = text
@@ -81,6 +84,25 @@ class FromRegexesNamedEntitiesPredictor(NamedEntitiesPredictor):
                 )
         return result
 
+    def predict_inline_annotation_spans(self, text, language="en-US"):
+        spans = []
+        for named_entity_code in self.pattern_definitions:
+            pattern_definition = self.pattern_definitions[named_entity_code]
+            for match in re.finditer(pattern_definition.pattern, text):
+                if match.start() == match.end():
+                    continue
+                spans.append(
+                    [
+                        match.start(),
+                        match.end(),
+                        "PN" if pattern_definition.parent_terms else "SN",
+                        pattern_definition.entity,
+                        pattern_definition.parent_terms or None,
+                    ]
+                )
+        # note: matches which overlap with a match of a preceding pattern are dropped
+        return remove_overlapping_standoff_annotations(spans)
+
     def get_parent_terms_for_named_entity(self, term, entity_code):
         if entity_code in self.pattern_definitions:
             named_entity_regex_definition = self.pattern_definitions[entity_code]
@@ -7,13 +7,20 @@ import torch
 import yaml
 from spacy.util import compounding, minibatch
 
+from neanno.prediction.model_loading import BackgroundModelLoader
 from neanno.prediction.predictor import NamedEntitiesPredictor
+from neanno.prediction.spacy_models import (
+    acquire_spacy_model,
+    copy_spacy_model_sharing_vocab,
+    load_spacy_model_sharing_vocab,
+    release_spacy_model,
+    save_spacy_model_without_vocab,
+)
 from neanno.utils.list import is_majority_of_last_n_items_decreasing
 from neanno.utils.signals import *
 from neanno.utils.text import (
     extract_annotations_for_spacy_ner,
     remove_all_annotations_from_text,
-    replace_from_to,
 )
 
 
@@ -23,8 +30,11 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
     source_model = None
     target_model_directory = None
     target_model_name = None
-    spacy_model = None
+    spacy_model_loader = None
     is_using_gpu = None
+    batch_size = 256
+    is_loading_model_in_background = True
+    is_source_model_acquired = False
 
     def __init__(self, predictor_config):
         super().__init__(predictor_config)
@@ -38,11 +48,54 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
             self.target_model_directory = predictor_config["target_model_directory"]
         if "target_model_name" in predictor_config:
             self.target_model_name = predictor_config["target_model_name"]
-        self.spacy_model = (
-            spacy.blank(self.source_model.replace("blank:", "", 1))
-            if self.source_model.startswith("blank:")
-            else spacy.load(self.source_model)
+        if "batch_size" in predictor_config:
+            self.batch_size = predictor_config["batch_size"]
+        if "is_loading_model_in_background" in predictor_config:
+            self.is_loading_model_in_background = predictor_config[
+                "is_loading_model_in_background"
+            ]
+        # note: the model is loaded in the background by default, so neanno can start
+        #       without waiting for it. until it is loaded, the predictor predicts
+        #       nothing. the model version is bumped once it is loaded.
+        self.spacy_model_loader = BackgroundModelLoader(
+            self.load_source_model,
+            self.bump_model_version,
+            self.is_loading_model_in_background,
+        )
+
+    def load_source_model(self):
+        """ Loads the spacy model specified by source_model."""
+        # note: the source model is loaded only once per process and its vocab incl.
+        #       the vectors is shared with the other predictors using the same source
+        #       model. the pipes of this predictor are its own.
+        source_model = acquire_spacy_model(self.source_model)
+        self.is_source_model_acquired = True
+        result = copy_spacy_model_sharing_vocab(source_model)
+        print(
+            "Loaded model '{}' of predictor '{}'.".format(self.source_model, self.name)
         )
+        return result
+
+    def unload(self):
+        if self.is_source_model_acquired:
+            self.is_source_model_acquired = False
+            release_spacy_model(self.source_model)
+
+    @property
+    def spacy_model(self):
+        """ The spacy model or None if it is not loaded (yet)."""
+        return self.spacy_model_loader.get_model()
+
+    @spacy_model.setter
+    def spacy_model(self, value):
+        self.spacy_model_loader.set_model(value)
+
+    @property
+    def readiness(self):
+        return self.spacy_model_loader.state
+
+    def wait_until_ready(self, timeout=None):
+        return self.spacy_model_loader.get_model(timeout) is not None
 
     @property
     def supports_online_training(self):
@@ -52,6 +105,16 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
     def supports_batch_training(self):
         return True
 
+    @property
+    def supports_training_in_process(self):
+        return True
+
+    def save_model(self, directory):
+        save_spacy_model_without_vocab(self.spacy_model, directory)
+
+    def load_model(self, directory):
+        self.spacy_model = load_spacy_model_sharing_vocab(directory, self.spacy_model)
+
     @property
     def project_config_validation_schema_custom_part(self):
         return yaml.load(
@@ -65,6 +128,13 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
             target_model_name:
                 type: string
                 required: False
+            batch_size:
+                type: integer
+                required: False
+                min: 1
+            is_loading_model_in_background:
+                type: boolean
+                required: False
             """,
             Loader=yaml.FullLoader,
         )
@@ -80,10 +150,17 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
         entity_codes_to_train,
         signals,
     ):
+        # wait until the source model is loaded
+        self.wait_until_ready()
+
+        # note: a copy of the model is trained, so the model in use is only replaced
+        #       if the training is completed, ie. not cancelled
+        spacy_model = copy_spacy_model_sharing_vocab(self.spacy_model)
+
         # ensure and get the ner pipe from the spacy model
-        if "ner" not in self.spacy_model.pipe_names:
-            self.spacy_model.add_pipe(self.spacy_model.create_pipe("ner"), last=True)
-        ner_pipe = self.spacy_model.get_pipe("ner")
+        if "ner" not in spacy_model.pipe_names:
+            spacy_model.add_pipe(spacy_model.create_pipe("ner"), last=True)
+        ner_pipe = spacy_model.get_pipe("ner")
         # ensure we have all relevant named entities in the model
         for entity_code_to_train in entity_codes_to_train:
             ner_pipe.add_label(entity_code_to_train)
@@ -106,15 +183,16 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
         emit_message("Using GPU..." if self.is_using_gpu else "Using CPU...", signals)
 
         max_iterations = 100
-        # note: this removes the unnamed vectors warning, TBD if needs changes
-        self.spacy_model.vocab.vectors.name = "spacy_pretrained_vectors"
-        optimizer = self.spacy_model.begin_training()
+        optimizer = spacy_model.begin_training()
         other_pipes = [
-            # pipe for pipe in self.spacy_model.pipe_names if pipe != "ner"
+            # pipe for pipe in spacy_model.pipe_names if pipe != "ner"
         ]
         iteration_losses = []
-        with self.spacy_model.disable_pipes(*other_pipes):
+        with spacy_model.disable_pipes(*other_pipes):
             for iteration in range(max_iterations):
+                # stop training if the job has been cancelled
+                if is_cancellation_requested(signals):
+                    break
                 emit_partial_message("Iteration {}...".format(iteration), signals)
                 random.shuffle(trainset_for_spacy)
                 losses = {}
@@ -123,7 +201,7 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
                 )
                 for batch in batches:
                     texts, annotations = zip(*batch)
-                    self.spacy_model.update(
+                    spacy_model.update(
                         texts, annotations, sgd=optimizer, drop=0.35, losses=losses
                     )
                 iteration_loss = losses["ner"]
@@ -139,14 +217,21 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
                 ):
                     break
 
+        # keep the previous model if the training has been cancelled
+        if is_cancellation_requested(signals):
+            emit_message("Training cancelled, the previous model is kept.", signals)
+            emit_new_line(signals)
+            return
+        self.spacy_model = spacy_model
+
         # save model to output directory
         if self.target_model_directory is not None:
             output_dir = pathlib.Path(self.target_model_directory)
             emit_message("Saving model to folder '{}'...".format(output_dir), signals)
             if not output_dir.exists():
                 output_dir.mkdir()
-            self.spacy_model.meta["name"] = self.target_model_name
-            self.spacy_model.to_disk(output_dir)
+            spacy_model.meta["name"] = self.target_model_name
+            spacy_model.to_disk(output_dir)
 
         # compute and tell training times
         emit_end_time_duration(start_time, "Training", signals)
@@ -159,16 +244,56 @@ class FromSpacyNamedEntitiesPredictor(NamedEntitiesPredictor):
 
         if self.spacy_model:
             # TODO: add parent terms
-            result = text
-            doc = self.spacy_model(result)
-            shift = 0
-            for ent in doc.ents:
-                old_result_length = len(result)
-                result = replace_from_to(
-                    result,
-                    ent.start_char + shift,
-                    ent.end_char + shift,
-                    "`{}``SN``{}`´".format(ent.text, ent.label_),
+            return self.get_inline_annotations_from_doc(text, self.spacy_model(text))
+        # note: while the model is loading or if it failed to load, nothing is predicted
+        return text
+
+    def predict_inline_annotations_batch(self, texts, languages=None):
+        """Predicts the contained named entities on the given texts (in batches)."""
+
+        if self.spacy_model:
+            texts = list(texts)
+            return [
+                self.get_inline_annotations_from_doc(text, doc)
+                for (text, doc) in zip(
+                    texts, self.spacy_model.pipe(texts, batch_size=self.batch_size)
                 )
-                shift += len(result) - old_result_length
-            return result
+            ]
+        else:
+            return list(texts)
+
+    def predict_inline_annotation_spans(self, text, language="en-US"):
+        """Predicts the contained named entities on the given text as standoff annotations."""
+
+        if self.spacy_model:
+            return self.get_standoff_annotations_from_doc(self.spacy_model(text))
+        return []
+
+    def predict_inline_annotation_spans_batch(self, texts, languages=None):
+        """Predicts the contained named entities on the given texts (in batches) as standoff annotations."""
+
+        texts = list(texts)
+        if self.spacy_model:
+            return [
+                self.get_standoff_annotations_from_doc(doc)
+                for doc in self.spacy_model.pipe(texts, batch_size=self.batch_size)
+            ]
+        else:
+            return [[] for _ in texts]
+
+    def get_standoff_annotations_from_doc(self, doc):
+        """Returns the named entities of the given (spacy) doc as standoff annotations."""
+        return [
+            [ent.start_char, ent.end_char, "SN", ent.label_, None] for ent in doc.ents
+        ]
+
+    def get_inline_annotations_from_doc(self, text, doc):
+        """Returns the given text with the named entities of the given (spacy) doc as inline annotations."""
+        pieces = []
+        position = 0
+        for ent in doc.ents:
+            pieces.append(text[position : ent.start_char])
+            pieces.append("`{}``SN``{}`´".format(ent.text, ent.label_))
+            position = ent.end_char
+        pieces.append(text[position:])
+        return "".join(pieces)
@@ -1,24 +1,247 @@
-from PyQt5.QtCore import QObject, QThreadPool
-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+
+from PyQt5.QtCore import QObject
+
+from neanno.prediction.model_loading import FAILED, LOADING
+from neanno.prediction.predictor import get_languages_of_texts
+from neanno.prediction.process_training import train_predictors_in_processes
+from neanno.prediction.stats import PredictorStats
+from neanno.utils.cache import LruCache
 from neanno.utils.list import get_set_of_list_and_keep_sequence, not_none
-from neanno.utils.multithreading import ConsoleSignalsHandler, ParallelWorker
+from neanno.utils.multithreading import ConsoleSignalsHandler, ParallelJobScheduler
 from neanno.utils.signals import *
-from neanno.utils.text import annotate_text, extract_annotations_as_list
+from neanno.utils.text import (
+    annotate_text,
+    extract_annotations_as_list,
+    extract_annotations_from_standoff,
+)
+
+NOT_CACHED = object()
 
 
 class PredictionPipeline(QObject):
     """ Predicts different annotations for a text."""
 
     _predictors = {}
-    _threadpool = QThreadPool()
+    # note: batch training and testing run as jobs in a thread pool, see
+    #       train_from_trainset_async and test_models_async
+    _job_scheduler = ParallelJobScheduler()
+    # note: if enabled, predictors which support it are trained in separate processes
+    #       (see enable_training_in_processes)
+    _is_training_in_processes_enabled = False
+    # note: predictions may run in a background thread (see PredictionsPrefetcher)
+    #       while the UI thread predicts or trains online. this lock ensures that the
+    #       predictors are not used by two of these at the same time. batch training
+    #       does not take the lock because it would block the UI for too long.
+    _lock = threading.RLock()
+    # note: the keys of the cached predictions include the names and model versions
+    #       of the predictors which made them (see get_predictions_cache_key), hence
+    #       predictions of changed or disabled predictors are never returned
+    _predictions_cache = LruCache(1024)
+    # note: in concurrent mode, the predictors predict in parallel threads (see
+    #       collect_predictions). predictions which time out are kept by predictor
+    #       name until they are done, to not stack up calls of a slow predictor.
+    #       until then, the predictor is skipped by predictions and its online
+    #       trainings are queued (nobody waits for it).
+    _prediction_executor = None
+    _prediction_timeout_seconds = None
+    _timed_out_predictions = {}
+    _timed_out_predictions_lock = threading.Lock()
+    _queued_online_trainings = {}
+    # note: all calls of predictors go through call_predictor which records their
+    #       latencies (and profiles them if enabled)
+    _predictor_stats = PredictorStats()
+
+    def enable_concurrent_prediction(self, workers_count=None, timeout_seconds=None):
+        """ Lets the predictors predict concurrently in a thread pool with the given number of threads (None = default of ThreadPoolExecutor). If timeout_seconds is given, predictions of single texts do not wait longer than that for a predictor."""
+        with self._lock:
+            self.disable_concurrent_prediction()
+            self._prediction_executor = ThreadPoolExecutor(max_workers=workers_count)
+            self._prediction_timeout_seconds = timeout_seconds
+
+    def disable_concurrent_prediction(self):
+        """ Lets the predictors predict one after another again (default)."""
+        with self._lock:
+            if self._prediction_executor is not None:
+                self._prediction_executor.shutdown(wait=False)
+            self._prediction_executor = None
+            self._prediction_timeout_seconds = None
+            with self._timed_out_predictions_lock:
+                self._timed_out_predictions = {}
+
+    def is_concurrent_prediction_enabled(self):
+        """ Checks if the predictors predict concurrently."""
+        return self._prediction_executor is not None
+
+    def enable_training_in_processes(self):
+        """ Lets batch training train the predictors which support it (see Predictor.supports_training_in_process) in parallel, each in a separate process. The trained models are loaded into the predictors when their training is done."""
+        self._is_training_in_processes_enabled = True
+
+    def disable_training_in_processes(self):
+        """ Lets batch training train all predictors one after another in a background thread again (default)."""
+        self._is_training_in_processes_enabled = False
+
+    def is_training_in_processes_enabled(self):
+        """ Checks if batch training trains predictors in separate processes."""
+        return self._is_training_in_processes_enabled
+
+    def collect_predictions(
+        self, predictors, function_name, *args, timeout_seconds=None
+    ):
+        """ Calls the specified function on the given predictors and returns their results in the sequence of the predictors. In concurrent mode, the results of predictors which did not respond within timeout_seconds or are still busy (see is_predictor_busy) are None."""
+
+        # predict one after another
+        # note: busy predictors (see is_predictor_busy) are skipped here as well
+        if self._prediction_executor is None or len(predictors) < 2:
+            result = []
+            for predictor in predictors:
+                if self.is_predictor_busy(predictor):
+                    result.append(None)
+                    continue
+                self.train_queued_online_trainings(predictor)
+                result.append(self.call_predictor(predictor, function_name, *args))
+            return result
+
+        # predict concurrently
+        futures = []
+        for predictor in predictors:
+            if self.is_predictor_busy(predictor):
+                # note: the predictor is still busy with a prediction which timed out
+                #       before, so it is skipped instead of waiting for it again
+                futures.append(None)
+                continue
+            self.train_queued_online_trainings(predictor)
+            futures.append(
+                self._prediction_executor.submit(
+                    self.call_predictor, predictor, function_name, *args
+                )
+            )
+        deadline = (
+            time.perf_counter() + timeout_seconds
+            if timeout_seconds is not None
+            else None
+        )
+        result = []
+        for (predictor, future) in zip(predictors, futures):
+            if future is None:
+                result.append(None)
+                continue
+            try:
+                result.append(
+                    future.result(
+                        max(0, deadline - time.perf_counter())
+                        if deadline is not None
+                        else None
+                    )
+                )
+            except FutureTimeoutError:
+                with self._timed_out_predictions_lock:
+                    self._timed_out_predictions[predictor.name] = future
+                future.add_done_callback(
+                    partial(self.forget_timed_out_prediction, predictor.name)
+                )
+                print(
+                    "Predictor '{}' did not respond within {} seconds. Its predictions are skipped until it has finished.".format(
+                        predictor.name, timeout_seconds
+                    )
+                )
+                result.append(None)
+        return result
+
+    def call_predictor(self, predictor, function_name, *args, **kwargs):
+        """ Calls the specified function on the given predictor and records its latency in the predictor stats."""
+        return self._predictor_stats.call(
+            predictor.name,
+            function_name,
+            getattr(predictor, function_name),
+            *args,
+            **kwargs
+        )
+
+    def get_predictor_stats(self):
+        """ Returns the stats of the predictors' calls (see PredictorStats), eg. to find out which predictor is slow."""
+        return self._predictor_stats
+
+    def forget_timed_out_prediction(self, predictor_name, future):
+        """ Removes the given prediction from the timed out predictions once it is done (called by the future)."""
+        with self._timed_out_predictions_lock:
+            if self._timed_out_predictions.get(predictor_name) is future:
+                del self._timed_out_predictions[predictor_name]
+
+    def is_predictor_busy(self, predictor):
+        """ Checks if the given predictor is still busy with a prediction which timed out before."""
+        with self._timed_out_predictions_lock:
+            return predictor.name in self._timed_out_predictions
+
+    def train_queued_online_trainings(self, predictor):
+        """ Passes the texts which have been queued while the given predictor was busy to its online training (see train_from_annotated_text)."""
+        for (annotated_text, language) in self._queued_online_trainings.pop(
+            predictor.name, []
+        ):
+            self.invoke_training_of_predictors(
+                "train_from_annotated_text",
+                lambda predictor_to_train: predictor_to_train is predictor,
+                annotated_text,
+                language,
+            )
+
+    def set_predictions_cache_size(self, max_size):
+        """ Sets the max. number of cached predictions (0 disables the cache)."""
+        with self._lock:
+            if max_size <= 0:
+                self._predictions_cache = None
+            elif self._predictions_cache is None:
+                self._predictions_cache = LruCache(max_size)
+            else:
+                self._predictions_cache.max_size = max_size
+
+    def clear_predictions_cache(self):
+        """ Removes all cached predictions."""
+        if self._predictions_cache is not None:
+            self._predictions_cache.clear()
+
+    def get_predictions_cache_stats(self):
+        """ Returns a dictionary with some statistics about the predictions cache or None if the cache is disabled."""
+        if self._predictions_cache is None:
+            return None
+        return self._predictions_cache.get_stats()
+
+    def get_predictions_cache_key(self, kind, text, language, predictors):
+        """ Returns the key under which the prediction of the given kind is cached."""
+        return (
+            kind,
+            text,
+            language,
+            tuple((predictor.name, predictor.model_version) for predictor in predictors),
+        )
+
+    def get_cached_prediction(self, key, predict_function):
+        """ Returns the cached prediction for the given key or predicts and caches it. predict_function has to return a (prediction, is_complete) tuple."""
+        if self._predictions_cache is None:
+            return predict_function()[0]
+        prediction = self._predictions_cache.get(key, NOT_CACHED)
+        if prediction is NOT_CACHED:
+            prediction, is_complete = predict_function()
+            # note: incomplete predictions, eg. because a predictor timed out, are not
+            #       cached so the predictor gets another chance next time
+            if is_complete:
+                self._predictions_cache.put(key, prediction)
+        return prediction
 
     def add_predictor(self, predictor):
         """Adds a predictor to the pipeline."""
-        self._predictors[predictor.name] = predictor
+        with self._lock:
+            self._predictors[predictor.name] = predictor
 
     def remove_predictor(self, name):
         """Removes a predictor from the pipeline."""
-        del self._predictors[name]
+        with self._lock:
+            predictor = self._predictors.pop(name)
+        predictor.unload()
 
     def has_predictor(self, name):
         """Checks if the pipeline has a predictor with the given name."""
@@ -44,11 +267,74 @@ class PredictionPipeline(QObject):
             if predictor.is_prediction_enabled
         ]
 
+    def get_predictors_to_invoke(self, function_name, condition_function):
+        """Returns the predictors which have the given function and where the given condition function returns true for the predictor."""
+        return [
+            predictor
+            for predictor in list(self.get_all_predictors())
+            if hasattr(predictor, function_name) and condition_function(predictor)
+        ]
+
+    def get_not_ready_predictors(self):
+        """Returns the predictors which are not ready yet, eg. because their models are still loading, or whose models failed to load."""
+        return [
+            predictor
+            for predictor in list(self.get_all_predictors())
+            if not predictor.is_ready
+        ]
+
+    def wait_until_predictors_ready(self, timeout=None):
+        """Waits until the models of all predictors are loaded (at most timeout seconds per predictor). Returns True if all predictors are ready."""
+        return all(
+            [
+                predictor.wait_until_ready(timeout)
+                for predictor in self.get_not_ready_predictors()
+            ]
+        )
+
+    def wait_until_predictor_ready(self, predictor, signals):
+        """Waits until the model of the given predictor is loaded and emits a note if it is still loading. Returns False (after emitting a note) if the model failed to load."""
+        if predictor.readiness == LOADING:
+            emit_message(
+                "Waiting for the model of '{}' to be loaded...".format(predictor.name),
+                signals,
+            )
+        if not predictor.wait_until_ready():
+            emit_message(
+                "Skipping '{}' because its model failed to load.".format(
+                    predictor.name
+                ),
+                signals,
+            )
+            emit_new_line(signals)
+            return False
+        return True
+
     def invoke_predictors(self, function_name, condition_function, *args, **kwargs):
-        """Invokes the given function on any predictor where the given condition function returns true for the predictor."""
-        for predictor in self.get_all_predictors():
-            if hasattr(predictor, function_name) and condition_function(predictor):
-                getattr(predictor, function_name)(*args, **kwargs)
+        """Invokes the given function on any predictor where the given condition function returns true for the predictor. Returns the invoked predictors."""
+        result = []
+        for predictor in self.get_predictors_to_invoke(
+            function_name, condition_function
+        ):
+            self.call_predictor(predictor, function_name, *args, **kwargs)
+            result.append(predictor)
+        return result
+
+    def invoke_training_of_predictors(
+        self, function_name, condition_function, *args, **kwargs
+    ):
+        """Invokes the given training function like invoke_predictors and bumps the model versions of the invoked predictors afterwards. Returns the trained predictors, ie. none if the training has been cancelled."""
+        result = self.invoke_predictors(
+            function_name, condition_function, *args, **kwargs
+        )
+        # note: the versions are bumped even if the training has been cancelled because
+        #       a predictor may have swapped in its new model before the cancellation
+        #       was requested. a needless bump only costs some cached predictions.
+        for predictor in result:
+            predictor.bump_model_version()
+        if is_cancellation_requested(kwargs.get("signals")):
+            return []
+        return result
 
     def collect_from_predictors(
         self, function_name, make_result_distinct, filter_none_values, *args, **kwargs
@@ -68,14 +354,34 @@ class PredictionPipeline(QObject):
             result = get_set_of_list_and_keep_sequence(result)
         return result
 
+    def raise_if_job_cancelled(self, signals):
+        """Emits a note and raises a JobCancelledError if the job of the given signals has been cancelled."""
+        if is_cancellation_requested(signals):
+            emit_message("Cancelled.", signals)
+            emit_new_line(signals)
+            raise_if_cancellation_requested(signals)
+
     def train_from_annotated_text(self, annotated_text, language):
         """Passes the given text to all predictors which are enabled for online training so these can learn from the annotations."""
-        self.invoke_predictors(
-            "train_from_annotated_text",
-            lambda predictor: predictor.is_online_training_enabled,
-            annotated_text,
-            language,
-        )
+        with self._lock:
+            for predictor in self.get_predictors_to_invoke(
+                "train_from_annotated_text",
+                lambda predictor: predictor.is_online_training_enabled,
+            ):
+                # note: predictors must not learn while they are still predicting,
+                #       hence the text is queued for busy predictors
+                if self.is_predictor_busy(predictor):
+                    self._queued_online_trainings.setdefault(predictor.name, []).append(
+                        (annotated_text, language)
+                    )
+                else:
+                    self.train_queued_online_trainings(predictor)
+                    self.invoke_training_of_predictors(
+                        "train_from_annotated_text",
+                        lambda predictor_to_train: predictor_to_train is predictor,
+                        annotated_text,
+                        language,
+                    )
 
     def train_from_trainset_async(
         self,
@@ -88,7 +394,7 @@ class PredictionPipeline(QObject):
         entity_codes_to_train,
         signals_handler=ConsoleSignalsHandler(),
     ):
-        """Trains all predictors which are enabled for batch training with the given trainset (async version)."""
+        """Trains all predictors which are enabled for batch training with the given trainset (async version). Returns a ParallelJob to wait for or cancel the training."""
 
         def _train_from_trainset_inner(*args, **kwargs):
             signals = kwargs["signals"]
@@ -102,23 +408,76 @@ class PredictionPipeline(QObject):
             emit_new_line(signals)
 
             # train all predictors that are enabled for batch training
-            self.invoke_predictors(
+            predictors_to_train = self.get_predictors_to_invoke(
                 "train_from_trainset",
                 lambda predictor: predictor.is_batch_training_enabled,
-                trainset,
-                text_column,
-                is_annotated_column,
-                language_column,
-                categories_column,
-                categories_to_train,
-                entity_codes_to_train,
-                signals=signals,
             )
+            predictors_count = len(predictors_to_train)
+            trained_predictors_count = 0
+            # train the predictors which support it in separate processes
+            if self._is_training_in_processes_enabled:
+                predictors_to_train_in_processes = [
+                    predictor
+                    for predictor in predictors_to_train
+                    if predictor.supports_training_in_process
+                ]
+                if predictors_to_train_in_processes:
+                    self.raise_if_job_cancelled(signals)
+                    # note: the models are saved and loaded for the transfer from and to
+                    #       the processes, hence they need to be loaded first
+                    predictors_ready_to_train_in_processes = [
+                        predictor
+                        for predictor in predictors_to_train_in_processes
+                        if self.wait_until_predictor_ready(predictor, signals)
+                    ]
+                    if predictors_ready_to_train_in_processes:
+                        train_predictors_in_processes(
+                            predictors_ready_to_train_in_processes,
+                            trainset,
+                            (
+                                text_column,
+                                is_annotated_column,
+                                language_column,
+                                categories_column,
+                                categories_to_train,
+                                entity_codes_to_train,
+                            ),
+                            signals,
+                            len(predictors_ready_to_train_in_processes)
+                            / predictors_count,
+                            self._lock,
+                        )
+                    trained_predictors_count += len(predictors_to_train_in_processes)
+                    emit_progress(trained_predictors_count / predictors_count, signals)
+                predictors_to_train = [
+                    predictor
+                    for predictor in predictors_to_train
+                    if predictor not in predictors_to_train_in_processes
+                ]
+            # train the other predictors in this thread
+            # note: the predictors are trained one by one to check for cancellation
+            #       in between
+            for predictor_to_train in predictors_to_train:
+                self.raise_if_job_cancelled(signals)
+                if self.wait_until_predictor_ready(predictor_to_train, signals):
+                    self.invoke_training_of_predictors(
+                        "train_from_trainset",
+                        lambda predictor: predictor is predictor_to_train,
+                        trainset,
+                        text_column,
+                        is_annotated_column,
+                        language_column,
+                        categories_column,
+                        categories_to_train,
+                        entity_codes_to_train,
+                        signals=signals,
+                    )
+                trained_predictors_count += 1
+                emit_progress(trained_predictors_count / predictors_count, signals)
+            self.raise_if_job_cancelled(signals)
 
         # start the parallel training
-        self._threadpool.start(
-            ParallelWorker(_train_from_trainset_inner, signals_handler)
-        )
+        return self._job_scheduler.schedule(_train_from_trainset_inner, signals_handler)
 
     def train_from_trainset(
         self,
@@ -131,10 +490,10 @@ class PredictionPipeline(QObject):
         entity_codes_to_train,
         signals_handler=ConsoleSignalsHandler(),
     ):
-        """Trains all predictors which are enabled for batch training with the given trainset (sync version)."""
+        """Trains all predictors which are enabled for batch training with the given trainset (sync version). Returns the finished ParallelJob."""
 
         # call the async version of this method
-        self.train_from_trainset_async(
+        job = self.train_from_trainset_async(
             trainset,
             text_column,
             is_annotated_column,
@@ -145,33 +504,165 @@ class PredictionPipeline(QObject):
             signals_handler,
         )
         # wait for done
-        # note: this waits until the entire threadpool is done
-        # TODO: check if there is a way to wait only for this worker
-        self._threadpool.waitForDone()
+        job.wait()
+        return job
 
     def predict_inline_annotations(self, text, language="en-US"):
         """Predicts the contained named entities on the given text."""
 
         if not text:
             return ""
-        annotations = []
-        for predictor in self.get_all_prediction_enabled_predictors():
-            annotations_by_predictor = extract_annotations_as_list(
-                predictor.predict_inline_annotations(text, language)
+        with self._lock:
+            predictors = self.get_all_prediction_enabled_predictors()
+            return self.get_cached_prediction(
+                self.get_predictions_cache_key(
+                    "inline_annotations", text, language, predictors
+                ),
+                lambda: self._predict_inline_annotations(text, language, predictors),
             )
-            annotations.extend(annotations_by_predictor)
-        return annotate_text(text, annotations)
+
+    def _predict_inline_annotations(self, text, language, predictors):
+        # note: the predictors return spans (standoff annotations) of texts without
+        #       annotations. the spans of all predictors are merged into the text at
+        #       once. texts which have annotations already are predicted inline.
+        if "`" in text:
+            predictions = self.collect_predictions(
+                predictors,
+                "predict_inline_annotations",
+                text,
+                language,
+                timeout_seconds=self._prediction_timeout_seconds,
+            )
+            annotations = [
+                annotation
+                for prediction in not_none(predictions)
+                for annotation in extract_annotations_as_list(prediction)
+            ]
+        else:
+            predictions = self.collect_predictions(
+                predictors,
+                "predict_inline_annotation_spans",
+                text,
+                language,
+                timeout_seconds=self._prediction_timeout_seconds,
+            )
+            annotations = [
+                annotation
+                for spans in not_none(predictions)
+                for annotation in extract_annotations_from_standoff(text, spans)
+            ]
+        return annotate_text(text, annotations), None not in predictions
 
     def predict_text_categories(self, text, language="en-US"):
         """Predicts the text categories of the given text."""
 
         if not text:
             return ""
+        with self._lock:
+            predictors = self.get_all_prediction_enabled_predictors()
+            # note: a copy is returned so callers cannot change the cached list
+            return list(
+                self.get_cached_prediction(
+                    self.get_predictions_cache_key(
+                        "text_categories", text, language, predictors
+                    ),
+                    lambda: self._predict_text_categories(text, language, predictors),
+                )
+            )
+
+    def _predict_text_categories(self, text, language, predictors):
+        predictions = self.collect_predictions(
+            predictors,
+            "predict_text_categories",
+            text,
+            language,
+            timeout_seconds=self._prediction_timeout_seconds,
+        )
         result = []
-        for predictor in self.get_all_prediction_enabled_predictors():
-            new_text_categories = predictor.predict_text_categories(text, language)
+        for new_text_categories in not_none(predictions):
             result.extend(new_text_categories)
             result = get_set_of_list_and_keep_sequence(result)
+        return result, None not in predictions
+
+    def predict_inline_annotations_batch(self, texts, languages=None):
+        """Predicts the contained annotations on the given texts (list), using the batch predictions of the predictors. languages can be a list with the language of each text, a single language or None (en-US)."""
+
+        texts = list(texts)
+        languages = get_languages_of_texts(texts, languages)
+        # note: like in predict_inline_annotations, empty texts are not predicted
+        indexes_to_predict = [index for (index, text) in enumerate(texts) if text]
+        texts_to_predict = [texts[index] for index in indexes_to_predict]
+        languages_to_predict = [languages[index] for index in indexes_to_predict]
+        annotations = [[] for _ in indexes_to_predict]
+        with self._lock:
+            # note: busy predictors (see is_predictor_busy) are skipped. like in
+            #       predict_inline_annotations, the predictors return spans
+            #       unless there are texts which have annotations already
+            if any("`" in text for text in texts_to_predict):
+                for predicted_texts in not_none(
+                    self.collect_predictions(
+                        self.get_all_prediction_enabled_predictors(),
+                        "predict_inline_annotations_batch",
+                        texts_to_predict,
+                        languages_to_predict,
+                    )
+                ):
+                    for (annotations_of_text, predicted_text) in zip(
+                        annotations, predicted_texts
+                    ):
+                        if predicted_text is not None:
+                            annotations_of_text.extend(
+                                extract_annotations_as_list(predicted_text)
+                            )
+            else:
+                for spans_of_texts in not_none(
+                    self.collect_predictions(
+                        self.get_all_prediction_enabled_predictors(),
+                        "predict_inline_annotation_spans_batch",
+                        texts_to_predict,
+                        languages_to_predict,
+                    )
+                ):
+                    for (annotations_of_text, text, spans) in zip(
+                        annotations, texts_to_predict, spans_of_texts
+                    ):
+                        annotations_of_text.extend(
+                            extract_annotations_from_standoff(text, spans)
+                        )
+        result = ["" for _ in texts]
+        for (index, text, annotations_of_text) in zip(
+            indexes_to_predict, texts_to_predict, annotations
+        ):
+            result[index] = annotate_text(text, annotations_of_text)
+        return result
+
+    def predict_text_categories_batch(self, texts, languages=None):
+        """Predicts the text categories of the given texts (list), using the batch predictions of the predictors. languages can be a list with the language of each text, a single language or None (en-US)."""
+
+        texts = list(texts)
+        languages = get_languages_of_texts(texts, languages)
+        # note: like in predict_text_categories, empty texts are not predicted
+        indexes_to_predict = [index for (index, text) in enumerate(texts) if text]
+        texts_to_predict = [texts[index] for index in indexes_to_predict]
+        languages_to_predict = [languages[index] for index in indexes_to_predict]
+        categories = [[] for _ in indexes_to_predict]
+        with self._lock:
+            # note: busy predictors (see is_predictor_busy) are skipped
+            for predicted_categories_of_texts in not_none(
+                self.collect_predictions(
+                    self.get_all_prediction_enabled_predictors(),
+                    "predict_text_categories_batch",
+                    texts_to_predict,
+                    languages_to_predict,
+                )
+            ):
+                for (categories_of_text, predicted_categories) in zip(
+                    categories, predicted_categories_of_texts
+                ):
+                    categories_of_text.extend(predicted_categories)
+        result = ["" for _ in texts]
+        for (index, categories_of_text) in zip(indexes_to_predict, categories):
+            result[index] = get_set_of_list_and_keep_sequence(categories_of_text)
         return result
 
     def get_parent_terms_for_named_entity(self, term, entity_code):
@@ -222,7 +713,7 @@ class PredictionPipeline(QObject):
         entity_codes_to_train,
         signals_handler=ConsoleSignalsHandler(),
     ):
-        """Tests the models of all predictors which are enabled for testing (async version)."""
+        """Tests the models of all predictors which are enabled for testing (async version). Returns a ParallelJob to wait for or cancel the testing."""
 
         def _test_models_inner(*args, **kwargs):
             signals = kwargs["signals"]
@@ -241,21 +732,29 @@ class PredictionPipeline(QObject):
             emit_new_line(signals)
 
             # test all predictors that are enabled for testing
-            self.invoke_predictors(
-                "test_model",
-                lambda predictor: predictor.is_testing_enabled,
-                testset,
-                text_column,
-                is_annotated_column,
-                language_column,
-                categories_column,
-                categories_to_train,
-                entity_codes_to_train,
-                signals=signals,
+            predictors_to_test = self.get_predictors_to_invoke(
+                "test_model", lambda predictor: predictor.is_testing_enabled
             )
+            for (index, predictor_to_test) in enumerate(predictors_to_test):
+                self.raise_if_job_cancelled(signals)
+                if self.wait_until_predictor_ready(predictor_to_test, signals):
+                    self.invoke_predictors(
+                        "test_model",
+                        lambda predictor: predictor is predictor_to_test,
+                        testset,
+                        text_column,
+                        is_annotated_column,
+                        language_column,
+                        categories_column,
+                        categories_to_train,
+                        entity_codes_to_train,
+                        signals=signals,
+                    )
+                emit_progress((index + 1) / len(predictors_to_test), signals)
+            self.raise_if_job_cancelled(signals)
 
         # start the testing
-        self._threadpool.start(ParallelWorker(_test_models_inner, signals_handler))
+        return self._job_scheduler.schedule(_test_models_inner, signals_handler)
 
     def test_models(
         self,
@@ -269,10 +768,10 @@ class PredictionPipeline(QObject):
         entity_codes_to_train,
         signals_handler=ConsoleSignalsHandler(),
     ):
-        """Tests the models of all predictors which are enabled for testing (sync version)."""
+        """Tests the models of all predictors which are enabled for testing (sync version). Returns the finished ParallelJob."""
 
         # call the async version of this method
-        self.test_models_async(
+        job = self.test_models_async(
             testset,
             testset_size,
             text_column,
@@ -284,6 +783,5 @@ class PredictionPipeline(QObject):
             signals_handler,
         )
         # wait for done
-        # note: this waits until the entire threadpool is done
-        # TODO: check if there is a way to wait only for this worker
-        self._threadpool.waitForDone()
+        job.wait()
+        return job
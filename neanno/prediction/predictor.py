@@ -1,9 +1,11 @@
+import itertools
 import uuid
 from abc import ABC, abstractmethod
 
 import pandas as pd
 import yaml
 
+from neanno.prediction.model_loading import READY
 from neanno.utils.metrics import (
     compute_category_metrics,
     compute_ner_metrics,
@@ -11,9 +13,33 @@ from neanno.utils.metrics import (
     get_confusion_matrix_png_bytes,
 )
 from neanno.utils.signals import *
-from neanno.utils.text import normalize_labels_values, remove_all_annotations_from_text
+from neanno.utils.text import (
+    convert_annotated_text_to_standoff,
+    normalize_labels_values,
+    remove_all_annotations_from_column,
+)
 from neanno.utils.yaml import validate_yaml
 
+# note: model versions are unique across all predictors, so a new predictor never
+#       gets the version of a predictor it replaces
+model_versions = itertools.count(1)
+
+
+def get_languages_of_texts(texts, languages=None):
+    """ Returns a list with the language of each of the given texts. languages can be a list with the language of each text, a single language or None (en-US)."""
+    if languages is None:
+        languages = "en-US"
+    if isinstance(languages, str):
+        return [languages] * len(texts)
+    languages = list(languages)
+    if len(languages) != len(texts):
+        raise ValueError(
+            "The number of languages ({}) does not match the number of texts ({}).".format(
+                len(languages), len(texts)
+            )
+        )
+    return languages
+
 
 class Predictor(ABC):
     """Base class for a predictor which can predict different things such as text categories, named entities or key terms."""
@@ -24,8 +50,10 @@ class Predictor(ABC):
     _is_prediction_enabled = None
     _is_testing_enabled = None
     _predictor_config = None
+    _model_version = None
 
     def __init__(self, predictor_config):
+        self._model_version = next(model_versions)
         self._predictor_config = predictor_config
         self._name = (
             self._predictor_config["name"]
@@ -130,6 +158,36 @@ class Predictor(ABC):
     def supports_batch_training(self):
         pass
 
+    @property
+    def readiness(self):
+        """ Tells if the predictor is ready to predict (READY), still loading its model (LOADING) or failed to load its model (FAILED). Predictors which are not ready predict nothing."""
+        return READY
+
+    @property
+    def is_ready(self):
+        return self.readiness == READY
+
+    def wait_until_ready(self, timeout=None):
+        """ Waits until the predictor is ready or timeout seconds (None = no limit) have passed. Returns True if the predictor is ready, False if it is still loading or failed to load its model."""
+        return True
+
+    def unload(self):
+        """ Releases the resources held by the predictor, eg. shared models. Is called when the predictor is removed from the pipeline."""
+        pass
+
+    @property
+    def supports_training_in_process(self):
+        """ Checks if the predictor can be trained in a separate process (see PredictionPipeline.enable_training_in_processes). This requires that the predictor can be created from its config in another process and that it implements save_model and load_model."""
+        return False
+
+    def save_model(self, directory):
+        """ Saves the predictor's model to the given directory after it has been trained in a separate process. Is only called if supports_training_in_process is True."""
+        pass
+
+    def load_model(self, directory):
+        """ Replaces the predictor's model with the model saved in the given directory (see save_model). Is only called if supports_training_in_process is True."""
+        pass
+
     @property
     def is_online_training_enabled(self):
         return self._is_online_training_enabled
@@ -162,6 +220,14 @@ class Predictor(ABC):
     def is_testing_enabled(self, value):
         self._is_testing_enabled = value
 
+    @property
+    def model_version(self):
+        return self._model_version
+
+    def bump_model_version(self):
+        """ Marks the predictor's model as changed, so predictions cached for the previous model are not used anymore."""
+        self._model_version = next(model_versions)
+
     def train_from_annotated_text(self, annotated_text, language="en-us"):
         pass
 
@@ -181,9 +247,64 @@ class Predictor(ABC):
     def predict_inline_annotations(self, text, language="en-US"):
         return text
 
+    def predict_inline_annotations_batch(self, texts, languages=None):
+        """ Predicts the inline annotations of the given texts (list). languages can be a list with the language of each text, a single language or None (en-US).
+
+        Predictors which can process many texts more efficiently at once should override this method.
+        """
+        texts = list(texts)
+        return [
+            self.predict_inline_annotations(text, language)
+            for (text, language) in zip(texts, get_languages_of_texts(texts, languages))
+        ]
+
+    def predict_inline_annotation_spans(self, text, language="en-US"):
+        """ Predicts the annotations of the given text (without annotations) as standoff annotations, ie. a list of [start_net, end_net, type_tiny, entity_code, parent_terms_raw] spans (see convert_annotated_text_to_standoff).
+
+        By default, the spans are extracted from the result of predict_inline_annotations. Predictors which find spans anyway should override this method to avoid generating and parsing the inline markup.
+        """
+        predicted_text = self.predict_inline_annotations(text, language)
+        return convert_annotated_text_to_standoff(predicted_text)[1] if predicted_text else []
+
+    def predict_inline_annotation_spans_batch(self, texts, languages=None):
+        """ Predicts the annotations of the given texts (list) as standoff annotations (see predict_inline_annotation_spans). languages can be a list with the language of each text, a single language or None (en-US).
+
+        Predictors which can process many texts more efficiently at once should override this method.
+        """
+        texts = list(texts)
+        # note: predictors which only implement an optimized predict_inline_annotations_batch
+        #       keep their optimization
+        if (
+            type(self).predict_inline_annotations_batch
+            is not Predictor.predict_inline_annotations_batch
+        ):
+            return [
+                convert_annotated_text_to_standoff(predicted_text)[1]
+                if predicted_text
+                else []
+                for predicted_text in self.predict_inline_annotations_batch(
+                    texts, languages
+                )
+            ]
+        return [
+            self.predict_inline_annotation_spans(text, language)
+            for (text, language) in zip(texts, get_languages_of_texts(texts, languages))
+        ]
+
     def predict_text_categories(self, text, language="en-US"):
         return []
 
+    def predict_text_categories_batch(self, texts, languages=None):
+        """ Predicts the categories of the given texts (list). languages can be a list with the language of each text, a single language or None (en-US).
+
+        Predictors which can process many texts more efficiently at once should override this method.
+        """
+        texts = list(texts)
+        return [
+            self.predict_text_categories(text, language)
+            for (text, language) in zip(texts, get_languages_of_texts(texts, languages))
+        ]
+
     def test_model(
         self,
         testset,
@@ -219,16 +340,16 @@ class CategoriesPredictor(Predictor):
 
         # compute metrics
         actual_categories_series = testset[categories_column]
-        predicted_categories_series = testset.apply(
-            lambda row: (
-                "|".join(
-                    self.predict_text_categories(
-                        row[text_column],
-                        row[language_column] if language_column else "en-US",
-                    )
+        predicted_categories_series = pd.Series(
+            [
+                "|".join(categories)
+                for categories in self.predict_text_categories_batch(
+                    testset[text_column],
+                    testset[language_column] if language_column else None,
                 )
-            ),
-            axis=1,
+            ],
+            index=testset.index,
+            dtype=object,
         )
         category_metrics = pd.DataFrame(
             compute_category_metrics(
@@ -313,14 +434,13 @@ class NamedEntitiesPredictor(Predictor):
 
         # compute metrics
         actual_annotations = testset[text_column]
-        predicted_annotations = testset.apply(
-            lambda row: (
-                self.predict_inline_annotations(
-                    remove_all_annotations_from_text(row[text_column]),
-                    row[language_column] if language_column else "en-US",
-                )
+        predicted_annotations = pd.Series(
+            self.predict_inline_annotations_batch(
+                remove_all_annotations_from_column(testset[text_column]),
+                testset[language_column] if language_column else None,
             ),
-            axis=1,
+            index=testset.index,
+            dtype=object,
         )
         ner_metrics = pd.DataFrame(
             compute_ner_metrics(
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from neanno.utils.cache import LruCache
+
+INLINE_ANNOTATIONS = "inline_annotations"
+TEXT_CATEGORIES = "text_categories"
+NOT_PREFETCHED = object()
+
+
+class PredictionsPrefetcher:
+    """ Predicts the inline annotations and categories of texts in a background thread, so they are available when the texts are shown."""
+
+    def __init__(self, prediction_pipeline, max_predictions_count=256):
+        self.prediction_pipeline = prediction_pipeline
+        self._predictions = LruCache(max_predictions_count)
+        self._futures = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        # note: a single worker is enough because the predictions are done one after
+        #       another in the pipeline anyway. the worker only has to be ahead of the
+        #       annotator.
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def predict(self, kind, text, language):
+        """ Runs the prediction of the given kind (INLINE_ANNOTATIONS or TEXT_CATEGORIES) with the pipeline."""
+        if kind == INLINE_ANNOTATIONS:
+            return self.prediction_pipeline.predict_inline_annotations(text, language)
+        if kind == TEXT_CATEGORIES:
+            return self.prediction_pipeline.predict_text_categories(text, language)
+        raise ValueError("Prediction kind '{}' is not supported.".format(kind))
+
+    def get_inline_annotations(self, text, language):
+        """ Gets the predicted inline annotations of the given text, either prefetched or predicted now."""
+        return self.get_prediction(INLINE_ANNOTATIONS, text, language)
+
+    def get_text_categories(self, text, language):
+        """ Gets the predicted categories of the given text, either prefetched or predicted now."""
+        return self.get_prediction(TEXT_CATEGORIES, text, language)
+
+    def get_prediction(self, kind, text, language):
+        """ Gets the prediction of the given kind for the given text, either prefetched or predicted now."""
+        key = (kind, text, language)
+        with self._lock:
+            prediction = self._predictions.get(key, NOT_PREFETCHED)
+            if prediction is not NOT_PREFETCHED:
+                return prediction
+            future = self._futures.get(key)
+            generation = self._generation
+            # note: predictions which were scheduled but not started yet are done
+            #       right here instead of waiting for the worker
+            if future is not None and future.cancel():
+                del self._futures[key]
+                future = None
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                # note: the prediction is repeated below so that errors surface where
+                #       they surfaced before prefetching existed
+                pass
+        result = self.predict(kind, text, language)
+        self.put_prediction(key, result, generation)
+        return result
+
+    def put_prediction(self, key, prediction, generation):
+        """ Caches a prediction unless the predictions were invalidated since it was started."""
+        with self._lock:
+            if generation == self._generation:
+                self._predictions.put(key, prediction)
+
+    def prefetch(self, requests):
+        """ Schedules the predictions for the given (kind, text, language) tuples, in order of priority. Scheduled predictions which are not requested anymore and have not started yet are cancelled."""
+        with self._lock:
+            requested_keys = set(requests)
+            for key in list(self._futures.keys()):
+                if key not in requested_keys and self._futures[key].cancel():
+                    del self._futures[key]
+            for key in requests:
+                if key in self._predictions or key in self._futures:
+                    continue
+                self._futures[key] = self._executor.submit(
+                    self._prefetch_inner, key, self._generation
+                )
+
+    def _prefetch_inner(self, key, generation):
+        try:
+            result = self.predict(*key)
+            self.put_prediction(key, result, generation)
+            return result
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._futures.pop(key, None)
+
+    def invalidate(self):
+        """ Drops all prefetched and scheduled predictions, eg. because the predictors have changed."""
+        with self._lock:
+            self._generation += 1
+            for future in self._futures.values():
+                future.cancel()
+            self._futures = {}
+            self._predictions.clear()
+
+    def get_stats(self):
+        """ Returns a dictionary with some statistics about the prefetched predictions."""
+        with self._lock:
+            result = self._predictions.get_stats()
+            result["scheduled"] = len(self._futures)
+            return result
+
+    def shutdown(self):
+        """ Cancels the scheduled predictions and stops the worker thread."""
+        self.invalidate()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,190 @@
+"""Trains predictors in separate processes, so that their training does not compete with the user interface for the GIL (see PredictionPipeline.enable_training_in_processes)."""
+
+import contextlib
+import importlib
+import multiprocessing
+import queue
+import shutil
+import tempfile
+import traceback
+
+from neanno.utils.signals import *
+
+
+class QueuedSignal:
+    """ A signal which sends the emitted values through a queue to the parent process."""
+
+    def __init__(self, messages_queue, predictor_name, signal_name):
+        self.messages_queue = messages_queue
+        self.predictor_name = predictor_name
+        self.signal_name = signal_name
+
+    def emit(self, *args):
+        self.messages_queue.put((self.predictor_name, self.signal_name, args))
+
+
+class ProcessTrainingJob:
+    """ Tells the predictor in a training process whether the training has been cancelled (see is_cancellation_requested in neanno.utils.signals)."""
+
+    def __init__(self, cancel_event):
+        self.cancel_event = cancel_event
+
+    def is_cancel_requested(self):
+        return self.cancel_event.is_set()
+
+
+class ProcessTrainingSignals:
+    """ The signals passed to a predictor which is trained in a separate process."""
+
+    def __init__(self, messages_queue, cancel_event, predictor_name):
+        self.message = QueuedSignal(messages_queue, predictor_name, "message")
+        self.image = QueuedSignal(messages_queue, predictor_name, "image")
+        self.progress = QueuedSignal(messages_queue, predictor_name, "progress")
+        self.job = ProcessTrainingJob(cancel_event)
+
+
+def train_predictor_in_process(
+    predictor_module_name,
+    predictor_class_name,
+    predictor_config,
+    trainset,
+    training_args,
+    model_directory,
+    messages_queue,
+    cancel_event,
+):
+    """ Creates a predictor from its config, trains it and saves its model to model_directory. Is run in a separate process, reports the outcome as success, cancelled or failure message."""
+    predictor_name = predictor_config["name"]
+    signals = ProcessTrainingSignals(messages_queue, cancel_event, predictor_name)
+    try:
+        predictor = getattr(
+            importlib.import_module(predictor_module_name), predictor_class_name
+        )(predictor_config)
+        predictor.train_from_trainset(trainset, *training_args, signals=signals)
+        if is_cancellation_requested(signals):
+            messages_queue.put((predictor_name, "cancelled", ()))
+        else:
+            predictor.save_model(model_directory)
+            messages_queue.put((predictor_name, "success", ()))
+    except:
+        messages_queue.put((predictor_name, "failure", (traceback.format_exc(),)))
+
+
+def train_predictors_in_processes(
+    predictors, trainset, training_args, signals, progress_share=1.0, lock=None
+):
+    """ Trains the given predictors in parallel, each in a separate process, and loads the trained models into the predictors (incl. bumping their model versions). The messages of the processes are emitted to the given signals, prefixed by the predictor's name. Returns the predictors which were trained.
+
+    progress_share is the share of the job's progress which the training of the given predictors makes up. lock (if given) is held while the trained models are swapped into the predictors, eg. to not swap a model while it predicts.
+    """
+
+    # start the processes
+    # note: each process gets its own copy of the trainset and creates the predictor
+    #       from its config, ie. it loads the predictor's source model again
+    context = multiprocessing.get_context("spawn")
+    messages_queue = context.Queue()
+    cancel_event = context.Event()
+    predictors_by_name = {predictor.name: predictor for predictor in predictors}
+    model_directories = {}
+    processes = {}
+    try:
+        for predictor in predictors:
+            model_directories[predictor.name] = tempfile.mkdtemp(prefix="neanno-")
+            processes[predictor.name] = context.Process(
+                target=train_predictor_in_process,
+                args=(
+                    type(predictor).__module__,
+                    type(predictor).__name__,
+                    dict(predictor.config, name=predictor.name),
+                    trainset,
+                    training_args,
+                    model_directories[predictor.name],
+                    messages_queue,
+                    cancel_event,
+                ),
+                daemon=True,
+            )
+            processes[predictor.name].start()
+
+        # stream the messages of the processes until all have finished
+        # note: the progress of the job is the mean progress of the processes
+        outcomes = {}
+        partial_messages = {name: "" for name in processes}
+        progresses = {name: 0.0 for name in processes}
+
+        def emit_progress_of_processes(predictor_name, progress):
+            progresses[predictor_name] = progress
+            emit_progress(
+                progress_share * sum(progresses.values()) / len(progresses), signals
+            )
+
+        while len(outcomes) < len(processes):
+            if is_cancellation_requested(signals):
+                cancel_event.set()
+            try:
+                (predictor_name, kind, args) = messages_queue.get(timeout=0.1)
+            except queue.Empty:
+                # note: processes which crashed (eg. out of memory) cannot report
+                for (predictor_name, process) in processes.items():
+                    if predictor_name not in outcomes and process.exitcode not in [
+                        None,
+                        0,
+                    ]:
+                        outcomes[predictor_name] = (
+                            "failure",
+                            "The training process exited with code {}.".format(
+                                process.exitcode
+                            ),
+                        )
+                continue
+            if kind == "message":
+                message, end_with_newline = args
+                partial_messages[predictor_name] += message
+                if end_with_newline:
+                    emit_message(
+                        "[{}] {}".format(predictor_name, partial_messages[predictor_name]),
+                        signals,
+                    )
+                    partial_messages[predictor_name] = ""
+            elif kind == "image":
+                signals.image.emit(*args)
+            elif kind == "progress":
+                emit_progress_of_processes(predictor_name, args[0])
+            elif kind in ["success", "cancelled", "failure"]:
+                outcomes.setdefault(predictor_name, (kind, args[0] if args else None))
+                emit_progress_of_processes(predictor_name, 1.0)
+
+        # load the trained models
+        result = []
+        failed_predictor_names = []
+        for (predictor_name, (kind, details)) in outcomes.items():
+            if kind == "success":
+                emit_message(
+                    "Loading trained model of '{}'...".format(predictor_name), signals
+                )
+                with lock if lock is not None else contextlib.suppress():
+                    predictors_by_name[predictor_name].load_model(
+                        model_directories[predictor_name]
+                    )
+                    predictors_by_name[predictor_name].bump_model_version()
+                result.append(predictors_by_name[predictor_name])
+            elif kind == "failure":
+                emit_message(
+                    "Training of '{}' failed:\n{}".format(predictor_name, details),
+                    signals,
+                )
+                failed_predictor_names.append(predictor_name)
+        if failed_predictor_names:
+            raise RuntimeError(
+                "The training of the following predictors failed: {}.".format(
+                    ", ".join(failed_predictor_names)
+                )
+            )
+        return result
+    finally:
+        for process in processes.values():
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+        for model_directory in model_directories.values():
+            shutil.rmtree(model_directory, ignore_errors=True)
@@ -0,0 +1,90 @@
+"""Shares the spacy source models of the predictors within a process, so that models which are used by several predictors, esp. their vocab incl. the vectors, are loaded only once."""
+
+import threading
+
+import spacy
+
+
+class SharedSpacyModel:
+    """ A spacy source model which is loaded once and referenced by one or more predictors."""
+
+    def __init__(self, source_model):
+        self.source_model = source_model
+        self.references_count = 0
+        self._model = None
+        self._lock = threading.Lock()
+
+    def get_model(self):
+        """ Returns the model, loads it if it has not been loaded yet."""
+        # note: callers which need the model while it is loaded wait for that load
+        with self._lock:
+            if self._model is None:
+                model = (
+                    spacy.blank(self.source_model.replace("blank:", "", 1))
+                    if self.source_model.startswith("blank:")
+                    else spacy.load(self.source_model)
+                )
+                # note: this removes the unnamed vectors warning when the models are
+                #       trained. it is done here, once, because the vectors are shared.
+                if not model.vocab.vectors.name:
+                    model.vocab.vectors.name = "spacy_pretrained_vectors"
+                self._model = model
+            return self._model
+
+
+_shared_models = {}
+_shared_models_lock = threading.Lock()
+
+
+def acquire_spacy_model(source_model):
+    """ Returns the shared spacy model specified by source_model (a model name/path or blank:<language>) and loads it if needed. Every call has to be paired with a call of release_spacy_model."""
+    with _shared_models_lock:
+        if source_model not in _shared_models:
+            _shared_models[source_model] = SharedSpacyModel(source_model)
+        shared_model = _shared_models[source_model]
+        shared_model.references_count += 1
+    try:
+        return shared_model.get_model()
+    except:
+        release_spacy_model(source_model)
+        raise
+
+
+def release_spacy_model(source_model):
+    """ Releases a reference to the shared spacy model specified by source_model. The model is dropped once it is not referenced anymore."""
+    with _shared_models_lock:
+        shared_model = _shared_models[source_model]
+        shared_model.references_count -= 1
+        if shared_model.references_count == 0:
+            del _shared_models[source_model]
+
+
+def create_spacy_model_with_vocab(base_model, pipe_names):
+    """ Creates an empty spacy model with the given (untrained) pipes which uses the vocab of the given base model."""
+    result = spacy.util.get_lang_class(base_model.lang)(
+        vocab=base_model.vocab, meta=dict(base_model.meta)
+    )
+    for pipe_name in pipe_names:
+        result.add_pipe(result.create_pipe(pipe_name))
+    return result
+
+
+def copy_spacy_model_sharing_vocab(base_model):
+    """ Copies the given spacy model incl. its pipes, but not its vocab. The copy uses the vocab of the given model, hence its vectors are not copied."""
+    # note: the copy's pipes can be trained without affecting the given model
+    return create_spacy_model_with_vocab(base_model, base_model.pipe_names).from_bytes(
+        base_model.to_bytes(exclude=["vocab"]), exclude=["vocab"]
+    )
+
+
+def save_spacy_model_without_vocab(model, directory):
+    """ Saves the given spacy model to the given directory without its vocab (see load_spacy_model_sharing_vocab)."""
+    model.to_disk(directory, exclude=["vocab"])
+
+
+def load_spacy_model_sharing_vocab(directory, base_model):
+    """ Loads a spacy model saved by save_spacy_model_without_vocab. The loaded model uses the vocab of the given base model."""
+    meta = spacy.util.get_model_meta(directory)
+    return create_spacy_model_with_vocab(base_model, meta["pipeline"]).from_disk(
+        directory, exclude=["vocab"]
+    )
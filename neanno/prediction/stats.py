@@ -0,0 +1,167 @@
+"""Collects statistics about the calls of predictors, eg. to find out which predictor slows down the predictions."""
+
+import atexit
+import cProfile
+import json
+import pstats
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class PredictorStats:
+    """ Records the number of calls and the latencies of the predictors' functions and optionally profiles the calls with cProfile. The percentiles are computed from the latest max_latencies_count latencies of each function."""
+
+    def __init__(self, max_latencies_count=1000):
+        self.max_latencies_count = max_latencies_count
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._profile_file_path = None
+        self._profile_stats = None
+        self._is_dump_at_exit_registered = False
+
+    def call(self, predictor_name, function_name, function, *args, **kwargs):
+        """ Calls the given function and records its latency under the given predictor and function name."""
+        profile = self.start_profile()
+        start_time = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start_time
+            if profile is not None:
+                self.stop_profile(profile)
+            self.record(predictor_name, function_name, seconds)
+
+    def record(self, predictor_name, function_name, seconds):
+        """ Records a call which took the given number of seconds."""
+        with self._lock:
+            key = (predictor_name, function_name)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {
+                    "count": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "latencies": deque(maxlen=self.max_latencies_count),
+                }
+                self._entries[key] = entry
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["latencies"].append(seconds)
+
+    def get_stats(self, predictor_name=None):
+        """ Returns a list with a dictionary per predictor and function (optionally only of the given predictor) which has the number of calls and the latencies in seconds."""
+        with self._lock:
+            entries = [
+                (key, dict(entry, latencies=list(entry["latencies"])))
+                for (key, entry) in self._entries.items()
+                if predictor_name is None or key[0] == predictor_name
+            ]
+        result = []
+        for ((entry_predictor_name, function_name), entry) in sorted(entries):
+            p50, p95, p99 = np.percentile(entry["latencies"], [50, 95, 99])
+            result.append(
+                {
+                    "predictor": entry_predictor_name,
+                    "function": function_name,
+                    "count": entry["count"],
+                    "total_seconds": entry["total_seconds"],
+                    "mean_seconds": entry["total_seconds"] / entry["count"],
+                    "p50_seconds": float(p50),
+                    "p95_seconds": float(p95),
+                    "p99_seconds": float(p99),
+                    "max_seconds": entry["max_seconds"],
+                }
+            )
+        return result
+
+    def format_stats(self):
+        """ Returns the stats as text table (latencies in milliseconds)."""
+        line_format = "{:<30} {:<40} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}"
+        lines = [
+            line_format.format(
+                "Predictor", "Function", "Calls", "Mean", "p50", "p95", "p99", "Max"
+            )
+        ]
+        for stats in self.get_stats():
+            lines.append(
+                line_format.format(
+                    stats["predictor"][:30],
+                    stats["function"][:40],
+                    stats["count"],
+                    *[
+                        "{:.1f}".format(stats[name] * 1000)
+                        for name in [
+                            "mean_seconds",
+                            "p50_seconds",
+                            "p95_seconds",
+                            "p99_seconds",
+                            "max_seconds",
+                        ]
+                    ]
+                )
+            )
+        return "\n".join(lines)
+
+    def dump_to_json(self, file_path):
+        """ Writes the stats to the given JSON file."""
+        with open(file_path, "w") as json_file:
+            json.dump({"predictors": self.get_stats()}, json_file, indent=2)
+
+    def reset(self):
+        """ Removes all recorded calls."""
+        with self._lock:
+            self._entries = {}
+
+    def enable_profiling(self, file_path):
+        """ Profiles the calls with cProfile. The profile is written to the given file when dump_profile or disable_profiling is called and when the program exits. It can be analyzed with pstats or tools like snakeviz."""
+        with self._lock:
+            self._profile_file_path = file_path
+            self._profile_stats = None
+            if not self._is_dump_at_exit_registered:
+                atexit.register(self.dump_profile)
+                self._is_dump_at_exit_registered = True
+
+    def disable_profiling(self):
+        """ Writes the profile and stops profiling."""
+        self.dump_profile()
+        with self._lock:
+            self._profile_file_path = None
+            self._profile_stats = None
+
+    def is_profiling_enabled(self):
+        return self._profile_file_path is not None
+
+    def get_profile_file_path(self):
+        return self._profile_file_path
+
+    def dump_profile(self):
+        """ Writes the profile of the calls so far to the file specified in enable_profiling."""
+        with self._lock:
+            if self._profile_file_path is not None and self._profile_stats is not None:
+                self._profile_stats.dump_stats(self._profile_file_path)
+
+    def start_profile(self):
+        if self._profile_file_path is None:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # note: since python 3.12, only one profiler can be active at a time, hence
+            #       calls which run concurrently to a profiled call are not profiled
+            return None
+        return profile
+
+    def stop_profile(self, profile):
+        profile.disable()
+        with self._lock:
+            if self._profile_file_path is None:
+                return
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(profile)
+            else:
+                self._profile_stats.add(profile)
@@ -34,6 +34,7 @@ from PyQt5.QtWidgets import (
 
 from neanno.configuration.configmanager import ConfigManager
 from neanno.models.textmodel import TextModel
+from neanno.prediction.model_loading import LOADING
 from neanno.ui.about import show_about_dialog
 from neanno.ui.category_selection import CategoriesSelectorWidget
 from neanno.ui.predictor_management import ManagePredictorsDialog
@@ -49,6 +50,9 @@ DEFAULT_PARENT_KEY_TERM = "<add your consolidating terms here, separated by comm
 class MainWindow(QMainWindow):
     """ The dialog shown to the user to do the annotation/labeling."""
 
+    batch_training_job = None
+    predictors_readiness_timer = None
+
     def __init__(self):
         """Constructor."""
 
@@ -68,6 +72,7 @@ class MainWindow(QMainWindow):
         self.layout_controls()
         self.setup_and_wire_navigator_incl_buttons()
         self.setup_and_wire_shortcuts()
+        self.watch_predictors_readiness()
 
         self.show()
         app.exec_()
@@ -97,6 +102,9 @@ class MainWindow(QMainWindow):
         self.textedit_highlighter = TextEditHighlighter(
             self.textedit.document(), config.named_entity_definitions
         )
+        # note: the annotation index of the text edit's text is built on demand and reset
+        #       whenever the text changes
+        self.textedit_annotation_index = None
         self.textedit.textChanged.connect(self.textedit_text_changed)
 
         # annotation monitor
@@ -225,6 +233,11 @@ class MainWindow(QMainWindow):
             self.test_models_button.setEnabled(False)
             predictors_from_vertical_layout.addWidget(self.test_models_button)
 
+            # Predictor Stats
+            predictor_stats_button = QPushButton("Predictor Stats")
+            predictor_stats_button.clicked.connect(self.show_predictor_stats)
+            predictors_from_vertical_layout.addWidget(predictor_stats_button)
+
             # Export Pipeline Model
             # export_pipeline_model_button = QPushButton("Export Pipeline Model")
             # export_pipeline_model_button.clicked.connect(self.export_pipeline_model)
@@ -449,6 +462,12 @@ class MainWindow(QMainWindow):
         # categories_selector
         if config.is_categories_enabled:
             self.categories_selector.clearFocus()
+        # start predicting the texts which are likely shown next
+        self.textmodel.prefetch_predictions(
+            self.navigator.currentIndex(),
+            self.navigator.backward_stack,
+            self.navigator.forward_stack,
+        )
 
     def update_dataset_related_controls(self):
         # annotated texts count
@@ -495,13 +514,22 @@ class MainWindow(QMainWindow):
         self.progressbar.setValue(new_progress_value)
 
     def textedit_text_changed(self):
+        self.textedit_annotation_index = None
         self.sync_parented_annotations()
         self.update_annotation_monitor()
 
+    def get_textedit_annotation_index(self):
+        """ Gets the annotation index of the text edit's current text."""
+        if self.textedit_annotation_index is None:
+            self.textedit_annotation_index = get_annotation_index(
+                self.textedit.toPlainText()
+            )
+        return self.textedit_annotation_index
+
     def sync_parented_annotations(self):
         # get annotation at current cursor position
-        annotation_at_current_cursor_pos = get_annotation_at_position(
-            self.textedit.toPlainText(), self.textedit.textCursor().position()
+        annotation_at_current_cursor_pos = self.get_textedit_annotation_index().get_annotation_at_position(
+            self.textedit.textCursor().position()
         )
         # update annotation for same parented keyterm
         if annotation_at_current_cursor_pos is not None and annotation_at_current_cursor_pos[
@@ -674,8 +702,8 @@ class MainWindow(QMainWindow):
             )
 
     def remove_annotation(self):
-        annotation = get_annotation_at_position(
-            self.textedit.toPlainText(), self.textedit.textCursor().position()
+        annotation = self.get_textedit_annotation_index().get_annotation_at_position(
+            self.textedit.textCursor().position()
         )
         # ensure there is an annotation to remove
         if annotation is not None:
@@ -780,7 +808,15 @@ class MainWindow(QMainWindow):
             self.navigator.navigate_to_same_index()
 
     def train_batch_models(self):
-        if self.textmodel.get_annotated_texts_count() < 10:
+        # note: while the models are trained, the button cancels the training
+        if (
+            self.batch_training_job is not None
+            and not self.batch_training_job.is_done()
+        ):
+            self.batch_training_job.cancel()
+            self.train_batch_models_button.setText("Cancelling Training...")
+            self.train_batch_models_button.setEnabled(False)
+        elif self.textmodel.get_annotated_texts_count() < 10:
             QMessageBox.information(
                 self,
                 "Unfortunately...",
@@ -789,7 +825,7 @@ class MainWindow(QMainWindow):
             )
         else:
             trainset = self.textmodel.get_trainset()
-            config.prediction_pipeline.train_from_trainset_async(
+            self.batch_training_job = config.prediction_pipeline.train_from_trainset_async(
                 trainset=trainset,
                 text_column=config.text_column,
                 is_annotated_column=config.is_annotated_column,
@@ -822,10 +858,90 @@ class MainWindow(QMainWindow):
                 signals_handler=ModelValidationSignalsHandler(self),
             )
 
+    def show_predictor_stats(self):
+        predictor_stats = config.prediction_pipeline.get_predictor_stats()
+        self.output_pane_text_edit.clear()
+        self.output_pane.setHidden(False)
+        self.insert_text_to_output_pane_text_edit("Predictor Stats", "\n")
+        self.insert_text_to_output_pane_text_edit("===============", "\n")
+        self.insert_text_to_output_pane_text_edit("", "\n")
+        self.insert_text_to_output_pane_text_edit(
+            "Latencies in milliseconds, percentiles of the latest {} calls.".format(
+                predictor_stats.max_latencies_count
+            ),
+            "\n",
+        )
+        self.insert_text_to_output_pane_text_edit("", "\n")
+        self.insert_text_to_output_pane_text_edit(
+            predictor_stats.format_stats(), "\n"
+        )
+        if predictor_stats.is_profiling_enabled():
+            predictor_stats.dump_profile()
+            self.insert_text_to_output_pane_text_edit("", "\n")
+            self.insert_text_to_output_pane_text_edit(
+                "The profile of the predictors has been written to '{}'.".format(
+                    predictor_stats.get_profile_file_path()
+                ),
+                "\n",
+            )
+        self.insert_text_to_output_pane_text_edit("", "\n")
+        self.output_pane_text_edit.insertHtml(
+            'Click <a href="neanno:exportPredictorStats">here</a> to export the stats as JSON.'
+        )
+
     def manage_predictors(self):
         ManagePredictorsDialog.show(self)
+        self.textmodel.invalidate_predictions()
+        self.navigator.navigate_to_same_index()
+        self.watch_predictors_readiness()
+
+    def watch_predictors_readiness(self):
+        """ Shows a status message while the models of predictors are loading and refreshes the predictions once they are loaded."""
+        if (
+            self.predictors_readiness_timer is None
+            and config.prediction_pipeline.get_not_ready_predictors()
+        ):
+            self.predictors_readiness_timer = QTimer(self)
+            self.predictors_readiness_timer.timeout.connect(
+                self.update_predictors_readiness
+            )
+            self.predictors_readiness_timer.start(500)
+            self.update_predictors_readiness()
+
+    def update_predictors_readiness(self):
+        not_ready_predictors = config.prediction_pipeline.get_not_ready_predictors()
+        loading_predictors = [
+            predictor
+            for predictor in not_ready_predictors
+            if predictor.readiness == LOADING
+        ]
+        if loading_predictors:
+            self.statusBar().showMessage(
+                "Loading models of predictors: {}...".format(
+                    ", ".join(predictor.name for predictor in loading_predictors)
+                )
+            )
+            return
+        # all models are loaded (or failed to load)
+        self.predictors_readiness_timer.stop()
+        self.predictors_readiness_timer = None
+        if not_ready_predictors:
+            self.statusBar().showMessage(
+                "Failed to load models of predictors: {}".format(
+                    ", ".join(predictor.name for predictor in not_ready_predictors)
+                )
+            )
+        else:
+            self.statusBar().showMessage("Models loaded.", 5000)
+        # note: the predictions shown so far lack the predictions of these predictors
+        self.textmodel.invalidate_predictions()
         self.navigator.navigate_to_same_index()
 
+    def closeEvent(self, event):
+        # note: otherwise scheduled predictions delay the exit
+        self.textmodel.shutdown_predictions_prefetcher()
+        super().closeEvent(event)
+
     def export_pipeline_model(self):
         QMessageBox.information(
             self,
@@ -884,17 +1000,25 @@ class MainWindow(QMainWindow):
                 with open(target_file_name, "w") as target_file:
                     target_file.write(self.output_pane_text_edit.toHtml())
                 QMessageBox.information(self, "Success", "Export completed.", QMessageBox.Ok)
+        elif action == "neanno:exportPredictorStats":
+            target_file_name, _ = QFileDialog.getSaveFileName(
+                QDesktopWidget(), "Export predictor stats", "", "JSON (*.json)"
+            )
+            if target_file_name:
+                config.prediction_pipeline.get_predictor_stats().dump_to_json(
+                    target_file_name
+                )
+                QMessageBox.information(self, "Success", "Export completed.", QMessageBox.Ok)
         else:
             raise ValueError("There is no handler for action '{}'.".format(action))
 
     @pyqtSlot()
     def batch_training_started(self):
-        self.train_batch_models_button.setEnabled(False)
         self.manage_predictors_button.setEnabled(False)
         self.train_batch_models_button_original_label = (
             self.train_batch_models_button.text()
         )
-        self.train_batch_models_button.setText("Training Batch Models...")
+        self.train_batch_models_button.setText("Cancel Training")
         self.output_pane_text_edit.clear()
         self.output_pane.setHidden(False)
 
@@ -915,6 +1039,8 @@ class MainWindow(QMainWindow):
         self.test_models_button.setEnabled(True)
         self.manage_predictors_button.setEnabled(True)
         self.insert_export_output_pane_contents_link()
+        # note: the predictions done so far are based on the models before training
+        self.textmodel.invalidate_predictions()
 
     @pyqtSlot()
     def model_testing_started(self):
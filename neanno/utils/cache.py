@@ -0,0 +1,111 @@
+"""Defines caches which are used to avoid recomputing expensive results."""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class LruCache:
+    """A bounded, thread-safe cache which evicts the least recently used entries first."""
+
+    def __init__(self, max_size=1024):
+        if max_size < 1:
+            raise ValueError(
+                "The max size of a cache must be at least 1 but {} was specified.".format(
+                    max_size
+                )
+            )
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, value):
+        with self._lock:
+            self._max_size = value
+            self._evict_if_needed()
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def hit_rate(self):
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups > 0 else 0
+
+    def get_or_compute(self, key, compute_function):
+        """Returns the cached value for the given key or computes, caches and returns it if the key is not cached yet."""
+
+        # return the cached value if there is one
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._misses += 1
+
+        # compute the value outside the lock so other threads are not blocked
+        # note: if two threads compute the same value concurrently, the last one wins.
+        #       this is acceptable because values of the same key are expected to be
+        #       equal.
+        value = compute_function()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict_if_needed()
+        return value
+
+    def get(self, key, default=None):
+        """Returns the cached value for the given key or the default value if the key is not cached."""
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._misses += 1
+            return default
+
+    def put(self, key, value):
+        """Adds or replaces the value for the given key."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict_if_needed()
+
+    def clear(self):
+        """Removes all entries from the cache and resets the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def get_stats(self):
+        """Returns a dictionary with some statistics about the cache."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self.hit_rate,
+            }
+
+    def _evict_if_needed(self):
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
@@ -3,12 +3,19 @@ import re
 
 import pandas as pd
 
+from neanno.utils.text import (
+    convert_annotated_text_to_standoff,
+    convert_standoff_to_annotated_text,
+    deserialize_standoff_annotations,
+    serialize_standoff_annotations,
+)
+
 WINDOWS_LINE_ENDING = b"\r\n"
 UNIX_LINE_ENDING = b"\n"
 
 
 class DatasetLocation:
-    supported_datasource_types = ["csv"]
+    supported_datasource_types = ["csv", "parquet"]
     type = None
     path = None
 
@@ -54,6 +61,120 @@ class DatasetManager:
         friendly_dataset_name = os.path.basename(file_to_load)
         return (result, friendly_dataset_name)
 
+    def load_dataset_chunks_from_location_string(
+        location_as_string, schema, chunk_size, fill_na=True
+    ):
+        """ Loads the dataset at the given location in chunks (dataframes with up to chunk_size rows), so that the entire dataset does not need to fit into memory. Returns a generator."""
+        location = DatasetLocation(location_as_string)
+        required_columns = list(schema.keys())
+        chunks = getattr(
+            DatasetManager,
+            "load_dataset_chunks_from_location_string_{}".format(location.type),
+        )(location, chunk_size)
+        for chunk in chunks:
+            if fill_na:
+                chunk = chunk.fillna("")
+            if not pd.Series(required_columns).isin(chunk.columns).all():
+                raise ValueError(
+                    "The specified dataset at '{}' does not have the expected columns. Ensure that the dataset includes the following columns (case-sensitive): {}.".format(
+                        location.path, ", ".join(required_columns)
+                    )
+                )
+            for column_name in schema.keys():
+                chunk[column_name] = chunk[column_name].astype(schema[column_name])
+            yield chunk
+
+    def load_dataset_chunks_from_location_string_csv(location, chunk_size):
+        file_to_load = location.path
+        if not os.path.isfile(file_to_load):
+            raise ValueError(
+                "The file '{}' does not exist. Ensure that you specify a file which exists.".format(
+                    file_to_load
+                )
+            )
+        return pd.read_csv(file_to_load, chunksize=chunk_size)
+
+    def load_dataset_chunks_from_location_string_parquet(location, chunk_size):
+        # note: reading parquet files in chunks requires pyarrow
+        import pyarrow.parquet as pq
+
+        if os.path.isdir(location.path):
+            files_to_load = ParquetDatasetChunksWriter.get_part_file_paths(
+                location.path
+            )
+        elif os.path.isfile(location.path):
+            files_to_load = [location.path]
+        else:
+            raise ValueError(
+                "The file '{}' does not exist. Ensure that you specify a file which exists.".format(
+                    location.path
+                )
+            )
+        for file_to_load in files_to_load:
+            for batch in pq.ParquetFile(file_to_load).iter_batches(
+                batch_size=chunk_size
+            ):
+                yield batch.to_pandas()
+
+    def create_dataset_chunks_writer(location_as_string, state=None):
+        """ Creates a writer which writes a dataset chunk by chunk to the given location. Pass the state of a previous writer (see get_state) to continue where it stopped."""
+        location = DatasetLocation(location_as_string)
+        if location.type == "csv":
+            return CsvDatasetChunksWriter(location.path, state)
+        return ParquetDatasetChunksWriter(location.path, state)
+
+    def convert_inline_to_standoff_annotations(
+        dataframe, text_column, annotations_column
+    ):
+        """Moves the (inline) annotations of the texts in text_column into annotations_column as serialized standoff annotations, leaving the plain texts in text_column (in place)."""
+        converted_texts = dataframe[text_column].map(convert_annotated_text_to_standoff)
+        dataframe[text_column] = converted_texts.map(
+            lambda converted_text: converted_text[0]
+        )
+        dataframe[annotations_column] = converted_texts.map(
+            lambda converted_text: serialize_standoff_annotations(converted_text[1])
+        )
+
+    def convert_standoff_to_inline_annotations(
+        dataframe, text_column, annotations_column, drop_annotations_column=True
+    ):
+        """Merges the standoff annotations from annotations_column into the texts of text_column as inline annotations (in place)."""
+        dataframe[text_column] = [
+            convert_standoff_to_annotated_text(
+                text, deserialize_standoff_annotations(standoff_annotations)
+            )
+            for (text, standoff_annotations) in zip(
+                dataframe[text_column], dataframe[annotations_column]
+            )
+        ]
+        if drop_annotations_column:
+            dataframe.drop(columns=[annotations_column], inplace=True)
+
+    def load_dataset_from_location_string_parquet(
+        location, required_columns, fill_na=True
+    ):
+        file_to_load = location.path
+        # note: directories are datasets which were written in parts, see
+        #       ParquetDatasetChunksWriter
+        if not os.path.exists(file_to_load):
+            raise ValueError(
+                "The file '{}' does not exist. Ensure that you specify a file which exists.".format(
+                    file_to_load
+                )
+            )
+        # note: reading parquet files requires pyarrow or fastparquet
+        result = pd.read_parquet(file_to_load)
+        if fill_na:
+            result = result.fillna("")
+        if not pd.Series(required_columns).isin(result.columns).all():
+            raise ValueError(
+                "The specified dataset at '{}' does not have the expected columns. Ensure that the dataset includes the following columns (case-sensitive): {}.".format(
+                    file_to_load, ", ".join(required_columns)
+                )
+            )
+        friendly_dataset_name = os.path.basename(file_to_load)
+        return (result, friendly_dataset_name)
+
     def save_dataset_to_location_string(dataframe, location_as_string):
         location = DatasetLocation(location_as_string)
         getattr(
@@ -63,6 +184,12 @@ class DatasetManager:
     def save_dataset_to_location_string_csv(dataframe, location):
         DatasetManager.save_dataset_to_csv(dataframe, location.path)
 
+    def save_dataset_to_location_string_parquet(dataframe, location):
+        DatasetManager.save_dataset_to_parquet(dataframe, location.path)
+
+    def save_dataset_to_parquet(dataframe, file_path):
+        dataframe.to_parquet(file_path, index=False)
+
     def save_dataset_to_csv(dataframe, file_path):
         """This is a workaround to save CSV files properly on Windows. Due to a bug too many newlines may be added. This function prevents that."""
 
@@ -77,3 +204,65 @@ class DatasetManager:
             content = content.replace(WINDOWS_LINE_ENDING, UNIX_LINE_ENDING)
             with open(file_path, "wb") as open_file:
                 open_file.write(content)
+
+
+class CsvDatasetChunksWriter:
+    """ Appends the chunks of a dataset to a CSV file. The state is the size of the file after the last complete chunk, so that a partially written chunk is removed when writing is continued."""
+
+    def __init__(self, file_path, state=None):
+        self.file_path = file_path
+        self.bytes_written = state["bytes_written"] if state else 0
+        with open(self.file_path, "ab") as open_file:
+            open_file.truncate(self.bytes_written)
+
+    def write(self, dataframe):
+        content = dataframe.to_csv(header=self.bytes_written == 0, index=False)
+        # note: see save_dataset_to_csv, the same applies here
+        if os.name == "nt":
+            content = content.replace("\r\n", "\n")
+        with open(self.file_path, "ab") as open_file:
+            open_file.write(content.encode("utf-8"))
+            self.bytes_written = open_file.tell()
+
+    def get_state(self):
+        return {"bytes_written": self.bytes_written}
+
+
+class ParquetDatasetChunksWriter:
+    """ Writes the chunks of a dataset as parts (one parquet file per chunk) into a directory because parquet files cannot be appended. The directory can be loaded like a parquet file. The state is the number of parts written."""
+
+    def __init__(self, directory_path, state=None):
+        self.directory_path = directory_path
+        self.parts_written = state["parts_written"] if state else 0
+        if os.path.isfile(self.directory_path):
+            raise ValueError(
+                "'{}' is a file but the dataset is written in parts into a directory. Ensure that you specify a directory or a path which does not exist yet.".format(
+                    self.directory_path
+                )
+            )
+        os.makedirs(self.directory_path, exist_ok=True)
+        # remove the parts which were written after the last known state
+        for part_file_path in ParquetDatasetChunksWriter.get_part_file_paths(
+            self.directory_path
+        )[self.parts_written :]:
+            os.remove(part_file_path)
+
+    def write(self, dataframe):
+        DatasetManager.save_dataset_to_parquet(
+            dataframe,
+            os.path.join(
+                self.directory_path, "part-{:05d}.parquet".format(self.parts_written)
+            ),
+        )
+        self.parts_written += 1
+
+    def get_state(self):
+        return {"parts_written": self.parts_written}
+
+    @staticmethod
+    def get_part_file_paths(directory_path):
+        return [
+            os.path.join(directory_path, file_name)
+            for file_name in sorted(os.listdir(directory_path))
+            if re.match(r"^part-\d+\.parquet$", file_name)
+        ]
@@ -23,38 +23,71 @@ class QueryDict(dict):
 
 def merge_dict_sum_numbers(dict1, dict2):
     """ Assumes two dictionaries with schema key:numeric value and merges them into a single dictionary whereby the numeric values are summed per key."""
-    result = {}
-    if dict1 is None:
-        dict1 = {}
-    if dict2 is None:
-        dict2 = {}
-    for key in dict1:
-        if key not in result:
-            result[key] = 0
-        result[key] += dict1[key]
-    for key in dict2:
-        if key not in result:
-            result[key] = 0
-        result[key] += dict2[key]
-    return result
+    return sum_dicts_numbers([dict1, dict2])
 
 
 def merge_dict_sum_child_dicts(dict1, dict2):
     """ Assumes two dictionaries with schema key:{child keys: numeric value} and merges the two into a single dictionary whereby the numeric values in the child dictionaries are summed."""
-    result = {}
-    if dict1 is None:
-        dict1 = {}
-    if dict2 is None:
-        dict2 = {}
-    for key in dict1:
-        if key not in result:
-            result[key] = {}
-        result[key] = merge_dict_sum_numbers(result[key], dict1[key])
-    for key in dict2:
-        if key not in result:
-            result[key] = {}
-        result[key] = merge_dict_sum_numbers(result[key], dict2[key])
-    return result
+    return sum_dicts_child_dicts_numbers([dict1, dict2])
+
+
+def add_dict_numbers(accumulator, dict_to_add):
+    """ Adds the numeric values of dict_to_add to the values of the same keys in accumulator (in place) and returns accumulator."""
+    if dict_to_add is None:
+        return accumulator
+    for key, value in dict_to_add.items():
+        accumulator[key] = accumulator.get(key, 0) + value
+    return accumulator
+
+
+def subtract_dict_numbers(accumulator, dict_to_subtract):
+    """ Subtracts the numeric values of dict_to_subtract from the values of the same keys in accumulator (in place) and returns accumulator. Keys whose values drop to zero are removed."""
+    if dict_to_subtract is None:
+        return accumulator
+    for key, value in dict_to_subtract.items():
+        new_value = accumulator.get(key, 0) - value
+        if new_value == 0:
+            accumulator.pop(key, None)
+        else:
+            accumulator[key] = new_value
+    return accumulator
+
+
+def add_child_dicts_numbers(accumulator, dict_to_add):
+    """ Adds the numeric values of the child dictionaries in dict_to_add (schema key:{child keys: numeric value}) to the child dictionaries in accumulator (in place) and returns accumulator."""
+    if dict_to_add is None:
+        return accumulator
+    for key, child_dict in dict_to_add.items():
+        if key not in accumulator:
+            accumulator[key] = {}
+        add_dict_numbers(accumulator[key], child_dict)
+    return accumulator
+
+
+def sum_dicts_numbers(dicts, accumulator=None):
+    """ Sums the numeric values per key over all given dictionaries (schema key:numeric value).
+
+    The dictionaries are consumed one by one, ie. dicts can be any iterable incl. a generator.
+    To process the dictionaries in chunks, pass the result of the previous chunk as accumulator.
+    """
+    if accumulator is None:
+        accumulator = {}
+    for dict_to_add in dicts:
+        add_dict_numbers(accumulator, dict_to_add)
+    return accumulator
+
+
+def sum_dicts_child_dicts_numbers(dicts, accumulator=None):
+    """ Sums the numeric values per key and child key over all given dictionaries (schema key:{child keys: numeric value}).
+
+    The dictionaries are consumed one by one, ie. dicts can be any iterable incl. a generator.
+    To process the dictionaries in chunks, pass the result of the previous chunk as accumulator.
+    """
+    if accumulator is None:
+        accumulator = {}
+    for dict_to_add in dicts:
+        add_child_dicts_numbers(accumulator, dict_to_add)
+    return accumulator
 
 
 def merge_dict(dict1, dict2):
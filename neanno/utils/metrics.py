@@ -5,14 +5,16 @@ import matplotlib.pyplot as plt
 import seaborn as sn
 from sklearn.metrics import confusion_matrix
 
-from neanno.utils.dict import merge_dict_sum_child_dicts
+from neanno.utils.dict import add_child_dicts_numbers, sum_dicts_child_dicts_numbers
 from neanno.utils.text import (
-    extract_annotations_as_list,
+    extract_annotations_from_column,
     extract_categories_from_categories_column,
     extract_entity_codes_from_annotated_texts_column,
 )
 from neanno.utils.list import get_set_of_list_and_keep_sequence
 
+NAMED_ENTITY_ANNOTATION_TYPES = ["standalone_named_entity", "parented_named_entity"]
+
 
 def f1_score(precision, recall):
     if precision + recall == 0:
@@ -24,18 +26,23 @@ def f1_score(precision, recall):
 def compute_ner_metrics_on_text_level(
     actual_annotations, predicted_annotations, considered_entity_codes
 ):
+    # note: annotations can be Annotation records or dicts, both support ["key"] access
     actual_annotations = [
         annotation
         for annotation in actual_annotations
-        if annotation["type"] in ["standalone_named_entity", "parented_named_entity"]
+        if annotation["type"] in NAMED_ENTITY_ANNOTATION_TYPES
         and annotation["entity_code"] in considered_entity_codes
     ]
     predicted_annotations = [
         annotation
         for annotation in predicted_annotations
-        if annotation["type"] in ["standalone_named_entity", "parented_named_entity"]
+        if annotation["type"] in NAMED_ENTITY_ANNOTATION_TYPES
         and annotation["entity_code"] in considered_entity_codes
     ]
+    actual_annotation_keys = set(
+        (annotation["entity_code"], annotation["start_net"], annotation["end_net"])
+        for annotation in actual_annotations
+    )
     counters = {
         entity_code: {
             "actual": 0,
@@ -50,13 +57,11 @@ def compute_ner_metrics_on_text_level(
     for predicted_annotation in predicted_annotations:
         entity_code = predicted_annotation["entity_code"]
         counters[entity_code]["predictions"] += 1
-        if any(
-            actual_annotation["entity_code"] == predicted_annotation["entity_code"]
-            and actual_annotation["start_net"] == predicted_annotation["start_net"]
-            and actual_annotation["end_net"] == predicted_annotation["end_net"]
-            for actual_annotation in actual_annotations
-        ):
-            # if predicted_annotation in actual_annotations:
+        if (
+            entity_code,
+            predicted_annotation["start_net"],
+            predicted_annotation["end_net"],
+        ) in actual_annotation_keys:
             counters[entity_code]["correct"] += 1
         else:
             counters[entity_code]["incorrect"] += 1
@@ -121,35 +126,33 @@ def compute_category_metrics_on_text_level(
 
 
 def aggregate_ner_metrics(ner_metrics1, ner_metrics2):
-    result = merge_dict_sum_child_dicts(ner_metrics1, ner_metrics2)
-    for entity_code in result:
-        possible = result[entity_code]["actual"]
-        number_predictions = result[entity_code]["predictions"]
-        correct = result[entity_code]["correct"]
-        result[entity_code]["precision"] = (
-            correct / number_predictions if number_predictions > 0 else 0
-        )
-        result[entity_code]["recall"] = correct / possible if possible > 0 else 0
-        result[entity_code]["f1_score"] = f1_score(
-            result[entity_code]["precision"], result[entity_code]["recall"]
-        )
-    return result
+    result = add_child_dicts_numbers(
+        add_child_dicts_numbers({}, ner_metrics1), ner_metrics2
+    )
+    return compute_metrics_ratios(result)
 
 
 def aggregate_category_metrics(category_metrics1, category_metrics2):
-    result = merge_dict_sum_child_dicts(category_metrics1, category_metrics2)
-    for category in result:
-        possible = result[category]["actual"]
-        number_predictions = result[category]["predictions"]
-        correct = result[category]["correct"]
-        result[category]["precision"] = (
+    result = add_child_dicts_numbers(
+        add_child_dicts_numbers({}, category_metrics1), category_metrics2
+    )
+    return compute_metrics_ratios(result)
+
+
+def compute_metrics_ratios(metrics):
+    """ (Re)computes precision, recall and f1 score from the summed counts of the given metrics (in place)."""
+    for key in metrics:
+        possible = metrics[key]["actual"]
+        number_predictions = metrics[key]["predictions"]
+        correct = metrics[key]["correct"]
+        metrics[key]["precision"] = (
             correct / number_predictions if number_predictions > 0 else 0
         )
-        result[category]["recall"] = correct / possible if possible > 0 else 0
-        result[category]["f1_score"] = f1_score(
-            result[category]["precision"], result[category]["recall"]
+        metrics[key]["recall"] = correct / possible if possible > 0 else 0
+        metrics[key]["f1_score"] = f1_score(
+            metrics[key]["precision"], metrics[key]["recall"]
         )
-    return result
+    return metrics
 
 
 def compute_ner_metrics(
@@ -159,28 +162,78 @@ def compute_ner_metrics(
 ):
     """ Computes some metrics incl. precision and recall on entity code level, given a text column with the true annotations and a column with the predicted annotations."""
 
-    actual_annotations_series = actual_annotated_texts_pandas_series.map(
-        lambda text: extract_annotations_as_list(
-            text, types_to_extract=["standalone_named_entity", "parented_named_entity"]
-        )
-    )
-    predicted_annotations_series = predicted_annotated_texts_pandas_series.map(
-        lambda text: extract_annotations_as_list(
-            text, types_to_extract=["standalone_named_entity", "parented_named_entity"]
-        )
-    )
+    # nothing to compute if there are no texts
+    if actual_annotated_texts_pandas_series.empty:
+        return {}
+
+    # get the entity codes to consider
     if considered_entity_codes is None:
         considered_entity_codes = extract_entity_codes_from_annotated_texts_column(
             actual_annotated_texts_pandas_series
         )
+    considered_entity_codes = get_set_of_list_and_keep_sequence(
+        considered_entity_codes
+    )
 
-    result = {}
-    for (index, actual_annotations) in actual_annotations_series.iteritems():
-        predicted_annotations = predicted_annotations_series[index]
-        ner_metrics_on_text_level = compute_ner_metrics_on_text_level(
-            actual_annotations, predicted_annotations, considered_entity_codes
+    # extract the actual and predicted annotations of all texts into flat tables
+    # note: only the texts which exist in the actual series are considered
+    key_columns = ["row_index", "entity_code", "start_net", "end_net"]
+    actual_annotations = extract_annotations_from_column(
+        actual_annotated_texts_pandas_series,
+        types_to_extract=NAMED_ENTITY_ANNOTATION_TYPES,
+    )[key_columns].astype({"entity_code": object})
+    actual_annotations = actual_annotations[
+        actual_annotations["entity_code"].isin(considered_entity_codes)
+    ]
+    predicted_annotations = extract_annotations_from_column(
+        predicted_annotated_texts_pandas_series,
+        types_to_extract=NAMED_ENTITY_ANNOTATION_TYPES,
+    )[key_columns].astype({"entity_code": object})
+    predicted_annotations = predicted_annotations[
+        predicted_annotations["entity_code"].isin(considered_entity_codes)
+        & predicted_annotations["row_index"].isin(
+            actual_annotated_texts_pandas_series.index
         )
-        result = aggregate_ner_metrics(result, ner_metrics_on_text_level)
+    ]
+
+    # a prediction is correct if there is an actual annotation with the same entity
+    # code and position in the same text
+    predicted_annotations = predicted_annotations.merge(
+        actual_annotations.drop_duplicates(),
+        how="left",
+        on=key_columns,
+        indicator=True,
+    )
+    predicted_annotations["correct"] = predicted_annotations["_merge"] == "both"
+
+    # count per entity code
+    counts = pd.DataFrame(
+        {
+            "actual": actual_annotations.groupby("entity_code").size(),
+            "predictions": predicted_annotations.groupby("entity_code").size(),
+            "correct": predicted_annotations.groupby("entity_code")["correct"].sum(),
+        },
+        columns=["actual", "predictions", "correct"],
+    )
+    counts = counts.reindex(considered_entity_codes).fillna(0).astype(int)
+
+    # assemble result
+    result = {}
+    for entity_code, entity_code_counts in counts.iterrows():
+        possible = int(entity_code_counts["actual"])
+        number_predictions = int(entity_code_counts["predictions"])
+        correct = int(entity_code_counts["correct"])
+        precision = correct / number_predictions if number_predictions > 0 else 0
+        recall = correct / possible if possible > 0 else 0
+        result[entity_code] = {
+            "actual": possible,
+            "predictions": number_predictions,
+            "correct": correct,
+            "incorrect": number_predictions - correct,
+            "precision": precision,
+            "recall": recall,
+            "f1_score": f1_score(precision, recall),
+        }
     return result
 
 
@@ -201,14 +254,18 @@ def compute_category_metrics(
             actual_categories_pandas_series
         )
 
-    result = {}
-    for (index, actual_categories) in actual_categories_series.iteritems():
-        predicted_categories = predicted_categories_series[index]
-        category_metrics_on_text_level = compute_category_metrics_on_text_level(
-            actual_categories, predicted_categories, considered_categories
+    # sum up the counts of all texts in place and compute the ratios once at the end
+    # note: the summed precision/recall values of the texts are meaningless but get
+    #       overwritten by compute_metrics_ratios
+    result = sum_dicts_child_dicts_numbers(
+        compute_category_metrics_on_text_level(
+            actual_categories,
+            predicted_categories_series[index],
+            considered_categories,
         )
-        result = aggregate_category_metrics(result, category_metrics_on_text_level)
-    return result
+        for (index, actual_categories) in actual_categories_series.items()
+    )
+    return compute_metrics_ratios(result)
 
 
 def get_confusion_matrix(actual_series, predicted_series, categories_to_train):
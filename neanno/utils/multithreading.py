@@ -1,4 +1,5 @@
 import sys
+import threading
 import time
 import traceback
 
@@ -9,31 +10,168 @@ from PyQt5.QtWidgets import *
 from abc import ABC, abstractmethod
 
 
+class JobCancelledError(Exception):
+    """Is raised when a job has been cancelled."""
+
+
+class ParallelJob:
+    """A handle to a function which runs in parallel (see ParallelJobScheduler). Allows to wait for the function, to cancel it and to get its progress and result."""
+
+    def __init__(self):
+        self._done_event = threading.Event()
+        self._cancel_requested_event = threading.Event()
+        self._progress = 0.0
+        self._result = None
+        self._exception = None
+        self._is_cancelled = False
+
+    def wait(self, timeout=None):
+        """Waits until the job is done or timeout seconds have passed. Returns True if the job is done."""
+        return self._done_event.wait(timeout)
+
+    def cancel(self):
+        """Asks the job to stop. A job which has not started yet does not start at all, a running job stops at the next point where its function checks for cancellation (see raise_if_cancellation_requested in neanno.utils.signals). Returns False if the job is done already."""
+        if self.is_done():
+            return False
+        self._cancel_requested_event.set()
+        return True
+
+    def is_cancel_requested(self):
+        return self._cancel_requested_event.is_set()
+
+    def is_done(self):
+        return self._done_event.is_set()
+
+    def is_cancelled(self):
+        """Checks if the job has stopped because it was cancelled."""
+        return self.is_done() and self._is_cancelled
+
+    def get_progress(self):
+        """Gets the progress so far (value between 0 and 1)."""
+        return self._progress
+
+    def set_progress(self, progress):
+        self._progress = progress
+
+    def result(self, timeout=None):
+        """Waits for the job and returns the result of its function. Raises the function's exception if it failed, JobCancelledError if it was cancelled and TimeoutError if it is not done within timeout seconds."""
+        if not self.wait(timeout):
+            raise TimeoutError("The job is not done after {} seconds.".format(timeout))
+        if self._is_cancelled:
+            raise JobCancelledError("The job has been cancelled.")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def complete(self, result=None, exception=None, is_cancelled=False):
+        """Marks the job as done, is called by the ParallelWorker which runs the job."""
+        self._result = result
+        self._exception = exception
+        self._is_cancelled = is_cancelled
+        if not is_cancelled and exception is None:
+            self._progress = 1.0
+        self._done_event.set()
+
+
+class ParallelJobSignals:
+    """Wraps the signals handler of a job. Gives the job's function access to the job, eg. to check for cancellation, and keeps track of the job's progress."""
+
+    def __init__(self, signals_handler, job):
+        self.signals_handler = signals_handler
+        self.job = job
+        self.progress = ParallelJobProgressSignal(signals_handler.progress, job)
+
+    def __getattr__(self, name):
+        return getattr(self.signals_handler, name)
+
+
+class ParallelJobProgressSignal:
+    """Stores the emitted progress in the job before it is passed on to the signals handler."""
+
+    def __init__(self, progress_signal, job):
+        self.progress_signal = progress_signal
+        self.job = job
+
+    def emit(self, percent_completed):
+        self.job.set_progress(percent_completed)
+        self.progress_signal.emit(percent_completed)
+
+
 class ParallelWorker(QRunnable):
-    """Runs a function in parallel to the UI thread."""
+    """Runs a function in parallel to the UI thread. The function gets the signals (incl. the job, see ParallelJobSignals) passed as signals keyword argument."""
 
     def __init__(self, fn, signals_handler, *args, **kwargs):
         super(ParallelWorker, self).__init__()
 
         self.fn = fn
         self.signals_handler = signals_handler
+        self.job = ParallelJob()
         self.args = args
         self.kwargs = kwargs
-        self.kwargs["signals"] = self.signals_handler
+        self.kwargs["signals"] = ParallelJobSignals(self.signals_handler, self.job)
 
     @pyqtSlot()
     def run(self):
+        result = None
+        exception = None
+        is_cancelled = False
         try:
             self.signals_handler.started.emit()
+            if self.job.is_cancel_requested():
+                raise JobCancelledError("The job has been cancelled before it started.")
             result = self.fn(*self.args, **self.kwargs)
+        except JobCancelledError:
+            is_cancelled = True
         except:
             traceback.print_exc()
             exctype, value = sys.exc_info()[:2]
+            exception = value
             self.signals_handler.failure.emit((exctype, value, traceback.format_exc()))
         else:
             self.signals_handler.success.emit(result)
         finally:
             self.signals_handler.completed.emit()
+            # note: the job is marked as done after the signals have been emitted, so
+            #       that code which waits for the job sees the effects of the handlers
+            self.job.complete(result, exception, is_cancelled)
+
+
+class ParallelJobScheduler:
+    """Runs functions in parallel to the UI thread (in a thread pool) and returns a ParallelJob handle for each of them."""
+
+    def __init__(self, threadpool=None):
+        self._threadpool = threadpool if threadpool is not None else QThreadPool()
+        self._jobs = []
+        self._lock = threading.Lock()
+
+    def schedule(self, fn, signals_handler, *args, **kwargs):
+        """Runs fn in the thread pool (see ParallelWorker) and returns its ParallelJob."""
+        worker = ParallelWorker(fn, signals_handler, *args, **kwargs)
+        with self._lock:
+            self._jobs = [job for job in self._jobs if not job.is_done()]
+            self._jobs.append(worker.job)
+        self._threadpool.start(worker)
+        return worker.job
+
+    def get_active_jobs(self):
+        """Returns the jobs which are not done yet."""
+        with self._lock:
+            return [job for job in self._jobs if not job.is_done()]
+
+    def cancel_all(self):
+        """Asks all jobs which are not done yet to stop."""
+        for job in self.get_active_jobs():
+            job.cancel()
+
+    def wait_for_all(self, timeout=None):
+        """Waits until all jobs are done or timeout seconds have passed. Returns True if all jobs are done."""
+        deadline = time.time() + timeout if timeout is not None else None
+        for job in self.get_active_jobs():
+            if not job.wait(
+                max(0, deadline - time.time()) if deadline is not None else None
+            ):
+                return False
+        return True
 
 
 class ParallelWorkerSignals(QObject):
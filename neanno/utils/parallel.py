@@ -0,0 +1,150 @@
+"""Provides functions to process large collections of items in parallel (in separate processes)."""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import deque
+
+# note: the settings below apply to all parallel maps which do not specify their own
+#       values. they can be changed at runtime, eg. set default_workers_count to 1 to disable
+#       parallel execution entirely.
+# number of worker processes (None = number of CPUs)
+default_workers_count = None
+# number of items which are sent to a worker process at once
+default_chunk_size = 2000
+# inputs with less items are processed serially
+# note: measured with benchmarks/text_benchmarks.py --parallel-workers 2: starting the
+#       pool takes about 1s, compute_term_distribution_from_column takes about 75us per
+#       text serially and sending the texts to the workers adds little. hence, with 2
+#       workers, the first call (which starts the pool) pays off from about 30000 texts.
+default_min_items_count_for_parallel_execution = 30000
+
+
+# note: the pool of map_chunks_in_parallel is kept alive between calls because
+#       starting the worker processes takes far longer than most of the computations
+#       done with it
+_pool = None
+_pool_workers_count = None
+_pool_lock = threading.RLock()
+
+
+def get_workers_count(requested_workers_count=None):
+    """ Gets the number of worker processes to use."""
+    result = (
+        requested_workers_count
+        if requested_workers_count is not None
+        else default_workers_count
+    )
+    if result is None:
+        result = os.cpu_count() or 1
+    return max(result, 1)
+
+
+def split_into_chunks(items, items_per_chunk):
+    """ Splits the given list into chunks (lists) of the given size."""
+    return [
+        items[start : start + items_per_chunk]
+        for start in range(0, len(items), items_per_chunk)
+    ]
+
+
+def map_chunks_in_parallel(
+    function,
+    items,
+    workers_count=None,
+    chunk_size=None,
+    min_items_count_for_parallel_execution=None,
+):
+    """ Splits the given items into chunks, calls function for each chunk (in a persistent pool of worker processes, see get_pool) and returns the function's results as list (in the chunks' order).
+
+    function is called with a list of items and needs to be picklable, ie. a module-level function or a partial of it.
+    Small inputs and inputs which shall be processed with a single worker are processed serially as a single chunk.
+    """
+
+    # get the effective settings
+    items = list(items)
+    workers_count = get_workers_count(workers_count)
+    if chunk_size is None:
+        chunk_size = default_chunk_size
+    if min_items_count_for_parallel_execution is None:
+        min_items_count_for_parallel_execution = (
+            default_min_items_count_for_parallel_execution
+        )
+
+    # process serially if parallel execution does not pay off
+    if (
+        workers_count == 1
+        or len(items) < min_items_count_for_parallel_execution
+        or len(items) <= chunk_size
+    ):
+        return [function(items)]
+
+    # process the chunks in parallel
+    with _pool_lock:
+        return get_pool(workers_count).map(
+            function, split_into_chunks(items, chunk_size)
+        )
+
+
+def get_pool(workers_count):
+    """ Gets the pool of worker processes used by map_chunks_in_parallel and (re)creates it if needed."""
+    global _pool, _pool_workers_count
+    with _pool_lock:
+        if _pool is None or _pool_workers_count != workers_count:
+            shutdown_pool()
+            # note: the worker processes are spawned (instead of forked) because forking
+            #       a process which runs Qt and other threads is not safe. this requires
+            #       that entry points guard their code with if __name__ == "__main__".
+            _pool = multiprocessing.get_context("spawn").Pool(workers_count)
+            _pool_workers_count = workers_count
+        return _pool
+
+
+def shutdown_pool():
+    """ Stops the worker processes used by map_chunks_in_parallel (if any). They are started again when needed."""
+    global _pool, _pool_workers_count
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool.join()
+            _pool = None
+            _pool_workers_count = None
+
+
+atexit.register(shutdown_pool)
+
+
+def map_lazily_in_parallel(
+    function, items, workers_count=None, initializer=None, initargs=()
+):
+    """ Calls function for each of the given items (in a pool of worker processes) and yields the results in the items' order as soon as they are available.
+
+    Unlike map_chunks_in_parallel, the items are consumed lazily, ie. only a few items per worker are pending at a time. This allows to process inputs which do not fit into memory, eg. a dataset which is loaded in chunks.
+    initializer (if given) is called with initargs once per worker process, eg. to load models which are needed by function. With a single worker, initializer and function are called in the current process.
+    function and initializer need to be picklable, ie. module-level functions or partials of them.
+    """
+
+    # process serially if only one worker shall be used
+    workers_count = get_workers_count(workers_count)
+    if workers_count == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            yield function(item)
+        return
+
+    # process in parallel
+    # note: the worker processes are spawned for the same reasons as in
+    #       map_chunks_in_parallel
+    max_pending_items_count = workers_count * 2
+    with multiprocessing.get_context("spawn").Pool(
+        workers_count, initializer, initargs
+    ) as pool:
+        pending_results = deque()
+        for item in items:
+            pending_results.append(pool.apply_async(function, (item,)))
+            if len(pending_results) >= max_pending_items_count:
+                yield pending_results.popleft().get()
+        while pending_results:
+            yield pending_results.popleft().get()
@@ -2,6 +2,8 @@
 
 import time
 
+from neanno.utils.multithreading import JobCancelledError
+
 
 def emit_top_header(text, signals):
     """ Emits a top header."""
@@ -30,6 +32,23 @@ def emit_partial_message(message, signals):
     signals.message.emit(message, False)
 
 
+def emit_progress(percent_completed, signals):
+    """Emits the progress so far (value between 0 and 1)."""
+    signals.progress.emit(percent_completed)
+
+
+def is_cancellation_requested(signals):
+    """Checks if the job which emits the given signals has been asked to stop (see ParallelJob.cancel)."""
+    job = getattr(signals, "job", None)
+    return job is not None and job.is_cancel_requested()
+
+
+def raise_if_cancellation_requested(signals):
+    """Raises a JobCancelledError if the job which emits the given signals has been asked to stop."""
+    if is_cancellation_requested(signals):
+        raise JobCancelledError("The job has been cancelled.")
+
+
 def emit_new_line(signals):
     """Emits a new line to improve readability."""
     signals.message.emit("", True)
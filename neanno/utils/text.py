@@ -1,12 +1,19 @@
 import base64
+import json
 import re
-from collections import Counter
-from functools import reduce
+import sys
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from functools import partial
+from itertools import chain
 
+import numpy as np
 import pandas as pd
 
-from neanno.utils.dict import merge_dict_sum_numbers
+from neanno.utils.cache import LruCache
+from neanno.utils.dict import add_dict_numbers
 from neanno.utils.list import ensure_items_within_set, get_set_of_list_and_keep_sequence
+from neanno.utils.parallel import map_chunks_in_parallel
 
 ANNOTATION_TYPES = [
     "standalone_key_term",
@@ -22,6 +29,11 @@ TINY_TO_LONG_ANNOTATION_TYPE_MAPPING = {
     "PN": "parented_named_entity",
 }
 
+LONG_TO_TINY_ANNOTATION_TYPE_MAPPING = {
+    long_type: tiny_type
+    for (tiny_type, long_type) in TINY_TO_LONG_ANNOTATION_TYPE_MAPPING.items()
+}
+
 ANNOTATION_REGEX = re.compile(
     r"""(?xs)
         `
@@ -40,69 +52,176 @@ ANNOTATION_REGEX = re.compile(
     """
 )
 
+# note: a simpler regex which matches the same annotations as ANNOTATION_REGEX but only
+#       captures the term. it is faster and sufficient to remove annotations.
+ANNOTATION_STRIP_REGEX = re.compile(
+    r"""(?xs)
+        `
+        (?P<term>[^`]*?)
+        ``
+        (?:SK|PK``.*?|SN``.*?|PN``.*?``.*?)
+        `´
+    """
+)
+
+
+class Annotation(
+    namedtuple(
+        "Annotation",
+        [
+            "term",
+            "type",
+            "entity_code",
+            "parent_terms_raw",
+            "parent_terms",
+            "start_net",
+            "end_net",
+            "start_gross",
+            "end_gross",
+        ],
+    )
+):
+    """ A compact and immutable record of an annotation within an annotated text.
+
+    Fields which do not apply to an annotation's type (eg. entity_code for key terms) are None.
+    For compatibility with code that treats annotations as dicts, fields can also be read by
+    key (eg. annotation["term"]). Keys of fields which do not apply are treated as missing.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            value = getattr(self, key, None) if key in self._fields else None
+            if value is None:
+                raise KeyError(key)
+            return value
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        return key in self._fields and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return [field for field in self._fields if getattr(self, field) is not None]
+
+    def values(self):
+        return [getattr(self, field) for field in self.keys()]
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.keys()]
+
+    def to_dict(self):
+        """ Returns the annotation as dict (without the fields which do not apply)."""
+        return dict(self.items())
+
+
+# note: the same text is usually parsed many times, eg. by the syntax highlighter, the
+#       annotation monitor and the online training of the predictors. to make repeated
+#       parses cheap, parsed annotations are cached by text and filter arguments.
+parsed_annotations_cache = LruCache(max_size=2048)
+
 
 def extract_annotations_as_generator(
     annotated_text, types_to_extract=None, entity_codes_to_extract=None
 ):
     """ Yields all annotations from an annotated text as a list."""
 
-    def extract_normalized_parent_terms(parent_terms):
-        result = []
-        for parent_term in ((parent_terms or "").strip()).split(","):
-            parent_term = parent_term.strip()
-            if parent_term and parent_term not in result:
-                result.append(parent_term)
-        return ", ".join(result)
-
     # ensure that types_to_extract has valid entries
     ensure_items_within_set(types_to_extract, ANNOTATION_TYPES, True)
 
+    # get the parsed annotations from the cache or parse the text if not cached yet
+    types_to_extract_key = (
+        tuple(types_to_extract) if types_to_extract is not None else None
+    )
+    entity_codes_to_extract_key = (
+        tuple(entity_codes_to_extract) if entity_codes_to_extract is not None else None
+    )
+    parsed_annotations = parsed_annotations_cache.get_or_compute(
+        (annotated_text, types_to_extract_key, entity_codes_to_extract_key),
+        lambda: tuple(
+            parse_annotations(
+                annotated_text, types_to_extract_key, entity_codes_to_extract_key
+            )
+        ),
+    )
+
+    # yield annotations
+    # note: annotations are immutable, hence they can be shared between callers
+    for annotation in parsed_annotations:
+        yield annotation
+
+
+def extract_normalized_parent_terms(parent_terms):
+    """ Normalizes the given (raw) parent terms, ie. removes surrounding whitespace, empty and duplicate terms."""
     result = []
-    for match in re.finditer(ANNOTATION_REGEX, annotated_text):
-        # assemble annotation and do the filtering in parallel
-        annotation = {}
-        annotation["term"] = match.group("term")
-        annotation["type"] = TINY_TO_LONG_ANNOTATION_TYPE_MAPPING.get(
+    for parent_term in ((parent_terms or "").strip()).split(","):
+        parent_term = parent_term.strip()
+        if parent_term and parent_term not in result:
+            result.append(parent_term)
+    return ", ".join(result)
+
+
+def parse_annotations(
+    annotated_text, types_to_extract=None, entity_codes_to_extract=None
+):
+    """ Parses all annotations from an annotated text (without caching). Use extract_annotations_as_generator unless you need to bypass the cache."""
+
+    # note: the text is walked only once. instead of stripping the annotations from
+    #       the prefix of each match to get the net positions, we keep track of the
+    #       number of markup chars seen so far (gross-to-net offset). this keeps the
+    #       parsing linear in the number of annotations.
+    gross_to_net_offset = 0
+    for match in ANNOTATION_REGEX.finditer(annotated_text):
+        # compute net positions and update the offset for subsequent matches
+        # note: this needs to happen before any filtering below because filtered
+        #       annotations still shift the net positions of subsequent ones
+        term = match.group("term")
+        start_net = match.start() - gross_to_net_offset
+        gross_to_net_offset += (match.end() - match.start()) - len(term)
+
+        # get the annotation's fields and do the filtering in parallel
+        annotation_type = TINY_TO_LONG_ANNOTATION_TYPE_MAPPING.get(
             match.group("type_tiny")
         )
-        if types_to_extract is not None and annotation["type"] not in types_to_extract:
+        if types_to_extract is not None and annotation_type not in types_to_extract:
             continue
-        if annotation["type"] == "standalone_named_entity":
-            annotation["entity_code"] = match.group("entity_code_sn")
-            if (
-                entity_codes_to_extract is not None
-                and annotation["entity_code"] not in entity_codes_to_extract
-            ):
-                continue
-        if annotation["type"] == "parented_named_entity":
-            annotation["entity_code"] = match.group("entity_code_pn")
+        entity_code = None
+        parent_terms_raw = None
+        parent_terms = None
+        if annotation_type == "standalone_named_entity":
+            entity_code = match.group("entity_code_sn")
+        if annotation_type == "parented_named_entity":
+            entity_code = match.group("entity_code_pn")
+            parent_terms_raw = match.group("parent_terms_pn")
+        if annotation_type == "parented_key_term":
+            parent_terms_raw = match.group("parent_terms_pk")
+        if entity_code is not None:
             if (
                 entity_codes_to_extract is not None
-                and annotation["entity_code"] not in entity_codes_to_extract
+                and entity_code not in entity_codes_to_extract
             ):
                 continue
-            annotation["parent_terms_raw"] = match.group("parent_terms_pn")
-            annotation["parent_terms"] = extract_normalized_parent_terms(
-                annotation["parent_terms_raw"]
-            )
-        if annotation["type"] == "parented_key_term":
-            annotation["parent_terms_raw"] = match.group("parent_terms_pk")
-            annotation["parent_terms"] = extract_normalized_parent_terms(
-                annotation["parent_terms_raw"]
-            )
-        annotation["start_net"] = len(
-            remove_all_annotations_from_text(annotated_text[: match.start()])
-        )
-        annotation["end_net"] = annotation["start_net"] + len(
-            remove_all_annotations_from_text(
-                annotated_text[match.start() : match.end()]
-            )
-        )
-        annotation["start_gross"] = match.start()
-        annotation["end_gross"] = match.end()
+            # note: entity codes repeat a lot, interning them saves memory when
+            #       many annotations are kept, eg. for a whole dataset
+            entity_code = sys.intern(entity_code)
+        if parent_terms_raw is not None:
+            parent_terms = extract_normalized_parent_terms(parent_terms_raw)
 
         # yield annotation
-        yield annotation
+        yield Annotation(
+            term,
+            annotation_type,
+            entity_code,
+            parent_terms_raw,
+            parent_terms,
+            start_net,
+            start_net + len(term),
+            match.start(),
+            match.end(),
+        )
 
 
 def extract_annotations_as_list(
@@ -208,48 +327,191 @@ def extract_annotations_by_type(
     plain_text = remove_all_annotations_from_text(annotated_text)
 
     # get the annotations dictionary
-    annotations = {}
-    # standalone key terms
-    if "standalone_key_term" in types_to_extract:
-        annotations[list_aliases["standalone_key_terms"]] = extract_annotations_as_list(
-            annotated_text, types_to_extract=["standalone_key_term"]
-        )
-    # parented key terms
-    if "parented_key_term" in types_to_extract:
-        annotations[list_aliases["parented_key_terms"]] = extract_annotations_as_list(
-            annotated_text, types_to_extract=["parented_key_term"]
-        )
-    # standalone named entities
-    if "standalone_named_entity" in types_to_extract:
-        annotations[
-            list_aliases["standalone_named_entities"]
-        ] = extract_annotations_as_list(
-            annotated_text, types_to_extract=["standalone_named_entity"]
-        )
-    # parented named entities
-    if "parented_named_entity" in types_to_extract:
-        annotations[
-            list_aliases["parented_named_entities"]
-        ] = extract_annotations_as_list(
-            annotated_text, types_to_extract=["parented_named_entity"]
-        )
+    # note: the text is parsed only once, the annotations are then distributed to
+    #       the lists of their respective types
+    type_to_list_alias_mapping = {
+        "standalone_key_term": list_aliases["standalone_key_terms"],
+        "parented_key_term": list_aliases["parented_key_terms"],
+        "standalone_named_entity": list_aliases["standalone_named_entities"],
+        "parented_named_entity": list_aliases["parented_named_entities"],
+    }
+    relevant_types = [
+        annotation_type
+        for annotation_type in ANNOTATION_TYPES
+        if annotation_type in types_to_extract
+    ]
+    annotations = {
+        type_to_list_alias_mapping[annotation_type]: []
+        for annotation_type in relevant_types
+    }
+    for annotation in extract_annotations_as_generator(
+        annotated_text, types_to_extract=relevant_types
+    ):
+        annotations[type_to_list_alias_mapping[annotation["type"]]].append(annotation)
 
     # return result
     return (plain_text, annotations)
 
 
+def extract_annotations_from_column(
+    annotated_texts_column, types_to_extract=None, entity_codes_to_extract=None
+):
+    """ Extracts the annotations of all texts in the specified column (pandas series) into a single, flat dataframe with one row per annotation.
+
+    The returned dataframe has the columns row_index (index of the text in the given column), type, entity_code,
+    term, parent_terms, start_net, end_net, start_gross and end_gross. Types and entity codes are categoricals,
+    positions are integers. This allows to do aggregations over whole columns with vectorized pandas operations.
+    """
+
+    # ensure that types_to_extract has valid entries
+    ensure_items_within_set(types_to_extract, ANNOTATION_TYPES, True)
+
+    # collect the fields of all annotations column-wise and return them as dataframe
+    # note: this is not done in parallel because parsing is faster than sending the
+    #       texts to other processes (see benchmarks/text_benchmarks.py)
+    return create_annotations_dataframe(
+        [
+            collect_annotation_fields(
+                annotated_texts_column.items(),
+                types_to_extract,
+                entity_codes_to_extract,
+            )
+        ],
+        annotated_texts_column.index.dtype,
+    )
+
+
+def extract_annotations_from_standoff_column(
+    texts_column,
+    standoff_annotations_column,
+    types_to_extract=None,
+    entity_codes_to_extract=None,
+):
+    """ Same as extract_annotations_from_column but for texts whose annotations are stored in standoff format (see convert_annotated_text_to_standoff). No text needs to be parsed."""
+
+    # ensure that types_to_extract has valid entries
+    ensure_items_within_set(types_to_extract, ANNOTATION_TYPES, True)
+
+    # collect the fields of all annotations column-wise and return them as dataframe
+    return create_annotations_dataframe(
+        [
+            collect_annotation_fields_from_standoff(
+                zip(
+                    texts_column.index,
+                    zip(
+                        texts_column,
+                        standoff_annotations_column.loc[texts_column.index],
+                    ),
+                ),
+                types_to_extract,
+                entity_codes_to_extract,
+            )
+        ],
+        texts_column.index.dtype,
+    )
+
+
+ANNOTATION_FIELDS = [
+    "row_index",
+    "type",
+    "entity_code",
+    "term",
+    "parent_terms",
+    "start_net",
+    "end_net",
+    "start_gross",
+    "end_gross",
+]
+
+
+def collect_annotation_fields(
+    indexed_annotated_texts, types_to_extract=None, entity_codes_to_extract=None
+):
+    """ Parses the given (row index, annotated text) pairs and returns the fields of their annotations column-wise (as dict of lists)."""
+
+    # note: the parse cache is bypassed here on purpose. a whole column would evict
+    #       the entries which are relevant for the texts currently edited.
+    result = {field: [] for field in ANNOTATION_FIELDS}
+    for (row_index, annotated_text) in indexed_annotated_texts:
+        append_annotation_fields(
+            result,
+            row_index,
+            parse_annotations(
+                annotated_text, types_to_extract, entity_codes_to_extract
+            ),
+        )
+    return result
+
+
+def collect_annotation_fields_from_standoff(
+    indexed_texts_with_standoff_annotations,
+    types_to_extract=None,
+    entity_codes_to_extract=None,
+):
+    """ Same as collect_annotation_fields but for (row index, (plain text, serialized standoff annotations)) pairs."""
+
+    result = {field: [] for field in ANNOTATION_FIELDS}
+    for (
+        row_index,
+        (plain_text, standoff_annotations),
+    ) in indexed_texts_with_standoff_annotations:
+        append_annotation_fields(
+            result,
+            row_index,
+            extract_annotations_from_standoff(
+                plain_text,
+                deserialize_standoff_annotations(standoff_annotations),
+                types_to_extract,
+                entity_codes_to_extract,
+            ),
+        )
+    return result
+
+
+def append_annotation_fields(fields, row_index, annotations):
+    """ Appends the fields of the given annotations to the given (column-wise) fields."""
+    for annotation in annotations:
+        fields["row_index"].append(row_index)
+        fields["type"].append(annotation.type)
+        fields["entity_code"].append(annotation.entity_code)
+        fields["term"].append(annotation.term)
+        fields["parent_terms"].append(annotation.parent_terms)
+        fields["start_net"].append(annotation.start_net)
+        fields["end_net"].append(annotation.end_net)
+        fields["start_gross"].append(annotation.start_gross)
+        fields["end_gross"].append(annotation.end_gross)
+
+
+def create_annotations_dataframe(fields_of_chunks, row_index_dtype):
+    """ Creates the dataframe returned by extract_annotations_from_column from the (column-wise) fields of one or more chunks."""
+
+    def concatenate_field(field):
+        return list(chain.from_iterable(fields[field] for fields in fields_of_chunks))
+
+    return pd.DataFrame(
+        {
+            "row_index": pd.Index(concatenate_field("row_index"), dtype=row_index_dtype),
+            "type": pd.Categorical(
+                concatenate_field("type"), categories=ANNOTATION_TYPES
+            ),
+            "entity_code": pd.Categorical(concatenate_field("entity_code")),
+            "term": pd.Series(concatenate_field("term"), dtype=object),
+            "parent_terms": pd.Series(concatenate_field("parent_terms"), dtype=object),
+            "start_net": np.array(concatenate_field("start_net"), dtype=np.int64),
+            "end_net": np.array(concatenate_field("end_net"), dtype=np.int64),
+            "start_gross": np.array(concatenate_field("start_gross"), dtype=np.int64),
+            "end_gross": np.array(concatenate_field("end_gross"), dtype=np.int64),
+        }
+    )
+
+
 def extract_entity_codes_from_annotated_texts_column(annotated_texts_column):
     """ Extracts the set of all entity codes that appear in the texts of the specified column (pandas series)."""
-    result = []
-    for (index, annotated_text) in annotated_texts_column.iteritems():
-        for annotation in extract_annotations_as_generator(
-            annotated_text,
-            types_to_extract=["standalone_named_entity", "parented_named_entity"],
-        ):
-            if annotation["entity_code"] not in result:
-                result.append(annotation["entity_code"])
-    result.sort()
-    return result
+    annotations = extract_annotations_from_column(
+        annotated_texts_column,
+        types_to_extract=["standalone_named_entity", "parented_named_entity"],
+    )
+    return sorted(annotations["entity_code"].dropna().unique().tolist())
 
 
 def extract_categories_from_categories_column(categories_column):
@@ -284,44 +546,94 @@ def extract_annotations_for_spacy_ner(annotated_text, entity_codes_to_extract=No
     return (plain_text, {"entities": annotations})
 
 
+class AnnotationIndex:
+    """ An index over the annotations of an annotated text which answers position and range queries in O(log n).
+
+    The index is built once per text, ie. it needs to be rebuilt when the text changes.
+    """
+
+    def __init__(self, annotated_text):
+        self.annotated_text = annotated_text
+        # note: annotations do not overlap, hence their starts and ends are both sorted
+        self.annotations = tuple(extract_annotations_as_generator(annotated_text))
+        self.starts_gross = [annotation.start_gross for annotation in self.annotations]
+        self.ends_gross = [annotation.end_gross for annotation in self.annotations]
+
+    def get_annotation_at_position(self, position):
+        """ Gets the annotation which is at the specified position. Returns None if that position is not an annotation."""
+        index = bisect_left(self.starts_gross, position) - 1
+        if index >= 0 and position < self.ends_gross[index]:
+            return self.annotations[index]
+        return None
+
+    def has_annotation_within_range(self, start_position, end_position):
+        """ Checks if the specified range overlaps with an annotation."""
+        # note: the first annotation which does not end before the range's start is the
+        #       only candidate for an overlap because all subsequent annotations start
+        #       even later.
+        index = bisect_left(self.ends_gross, start_position)
+        return index < len(self.ends_gross) and self.starts_gross[index] <= max(
+            start_position, end_position
+        )
+
+    def __len__(self):
+        return len(self.annotations)
+
+
+annotation_indexes_cache = LruCache(max_size=256)
+
+
+def get_annotation_index(annotated_text):
+    """ Gets the (cached) annotation index for the given annotated text."""
+    return annotation_indexes_cache.get_or_compute(
+        annotated_text, lambda: AnnotationIndex(annotated_text)
+    )
+
+
 def get_annotation_at_position(annotated_text, position):
     """ Gets the annotation which is at the specified position. Returns None if that position is not an annotation."""
-
-    result = None
-    for annotation in extract_annotations_as_generator(annotated_text):
-        if not (annotation["start_gross"] < position < annotation["end_gross"]):
-            continue
-        else:
-            return annotation
+    return get_annotation_index(annotated_text).get_annotation_at_position(position)
 
 
 def has_annotation_within_range(annotated_text, start_position, end_position):
     """ Checks if the specified range overlaps with an annotation. """
-
-    for annotation in extract_annotations_as_generator(annotated_text):
-        if not (
-            (
-                start_position < annotation["start_gross"]
-                and end_position < annotation["start_gross"]
-            )
-            or (
-                start_position > annotation["start_gross"]
-                and start_position > annotation["end_gross"]
-            )
-        ):
-            # there is an overlap => return True
-            return True
-    # no overlap found => return False
-    return False
+    return get_annotation_index(annotated_text).has_annotation_within_range(
+        start_position, end_position
+    )
 
 
 def remove_all_annotations_from_text(annotated_text):
     """Removes all annotations from the specified text."""
 
-    new_text = re.sub(
-        ANNOTATION_REGEX, lambda match: match.group("term"), annotated_text
+    # note: texts without a backtick cannot contain annotations
+    if "`" not in annotated_text:
+        return annotated_text
+    return ANNOTATION_STRIP_REGEX.sub(r"\g<term>", annotated_text)
+
+
+def remove_all_annotations_from_column(annotated_texts_column):
+    """ Removes all annotations from the texts in the specified column (pandas series) and returns the texts as new series."""
+
+    return pd.Series(
+        remove_all_annotations_from_texts(annotated_texts_column.tolist()),
+        index=annotated_texts_column.index,
+        name=annotated_texts_column.name,
+        dtype=object,
     )
-    return new_text
+
+
+def remove_all_annotations_from_texts(annotated_texts):
+    """ Removes all annotations from the specified texts (list) and returns the texts as list."""
+
+    # note: only the texts which contain a backtick can contain annotations and need
+    #       to be processed by the regex
+    texts = pd.Series(annotated_texts, dtype=object)
+    has_backtick = texts.str.contains("`", regex=False, na=False)
+    if has_backtick.any():
+        texts[has_backtick] = texts[has_backtick].str.replace(
+            ANNOTATION_STRIP_REGEX, r"\g<term>", regex=True
+        )
+    return texts.tolist()
 
 
 def mask_annotations(text):
@@ -354,126 +666,184 @@ def compute_named_entities_distribution_from_text(annotated_text):
         annotated_text,
         types_to_extract=["standalone_named_entity", "parented_named_entity"],
     ):
-        entity_code = entity_annotation["entity_code"]
+        entity_code = entity_annotation.entity_code
         if entity_code not in result:
             result[entity_code] = 0
         result[entity_code] += 1
     return result
 
 
-def compute_named_entities_distribution_from_column(pandas_series):
-    """ Computes the distribution over all named entities in the specified text column."""
+def compute_named_entities_distribution_from_column(pandas_series, distribution=None):
+    """ Computes the distribution over all named entities in the specified text column.
 
-    distribution_candidate = pandas_series.map(
-        lambda text: compute_named_entities_distribution_from_text(text)
-    ).agg(
-        lambda series: reduce(
-            lambda dist1, dist2: merge_dict_sum_numbers(dist1, dist2), series
-        )
+    To compute the distribution over several chunks of a column, pass the distribution of the previous chunks as distribution.
+    """
+
+    annotations = extract_annotations_from_column(
+        pandas_series,
+        types_to_extract=["standalone_named_entity", "parented_named_entity"],
     )
-    return (
-        distribution_candidate
-        if not isinstance(distribution_candidate, pd.Series)
-        else {}
+    return add_dict_numbers(
+        distribution if distribution is not None else {},
+        {
+            entity_code: int(count)
+            for entity_code, count in annotations.groupby("entity_code", observed=True)
+            .size()
+            .items()
+        },
     )
 
 
-def compute_categories_distribution_from_column(pandas_series):
-    """ Computes the distribution over all categories in the specified categories column."""
+def compute_categories_distribution_from_column(pandas_series, distribution=None):
+    """ Computes the distribution over all categories in the specified categories column.
 
-    distribution_candidate = pandas_series.map(
-        lambda categories_text: Counter(categories_text.split("|"))
-    ).agg(
-        lambda series: reduce(
-            lambda dist1, dist2: merge_dict_sum_numbers(dist1, dist2), series
-        )
-    )
-    return (
-        dict(distribution_candidate)
-        if not isinstance(distribution_candidate, pd.Series)
-        else {}
+    To compute the distribution over several chunks of a column, pass the distribution of the previous chunks as distribution.
+    """
+
+    # note: the counting is done with a Counter but a dict is returned
+    result = distribution if distribution is not None else Counter()
+    update_counter(
+        result,
+        (
+            category
+            for categories_text in pandas_series
+            for category in categories_text.split("|")
+        ),
     )
+    return dict(result) if distribution is None else result
 
 
-def compute_term_distribution_from_text(
+def update_counter(counter, items):
+    """ Counts the given items into the given counter (or dict) in place."""
+    if isinstance(counter, Counter):
+        # note: Counter.update counts in C which is a lot faster
+        counter.update(items)
+    else:
+        for item in items:
+            counter[item] = counter.get(item, 0) + 1
+    return counter
+
+
+# note: punctuation which is removed from the text (outside of annotations) before terms
+#       are counted
+TERM_DISTRIBUTION_PUNCTUATION_REMOVAL_TABLE = str.maketrans("", "", ".,?!<>[]|\"()+-")
+
+
+def generate_terms_for_term_distribution(
     annotated_text, blacklist_terms=[], include_entity_codes=True
 ):
-    """ Computes all terms and their frequencies from the specified text."""
+    """ Yields the terms of the specified text which are counted by the term distributions.
+
+    Whitespace and punctuation separate terms, annotated terms are taken as is (ie. a
+    multi-word annotation is one term). Parented annotations contribute their parent terms
+    instead of the annotated term. Numbers and blacklisted terms are skipped.
+    """
 
     def relevant_terms_from_match(match):
-        if match.group("type_tiny") == "SK":
-            return re.sub(" ", chr(127), match.group("term"))
-        if match.group("type_tiny") == "SN":
-            return re.sub(
-                " ",
-                chr(127),
+        # note: chr(127) protects the spaces within an annotation from the split below
+        type_tiny = match.group("type_tiny")
+        if type_tiny == "SK":
+            return match.group("term").replace(" ", chr(127))
+        if type_tiny == "SN":
+            return (
                 "{}:{}".format(match.group("entity_code_sn"), match.group("term"))
                 if include_entity_codes
-                else "{}".format(match.group("term")),
-            )
-        if match.group("type_tiny") == "PK":
+                else match.group("term")
+            ).replace(" ", chr(127))
+        if type_tiny == "PK":
             return " ".join(
-                [
-                    re.sub(" ", chr(127), parent_term.strip())
-                    for parent_term in match.group("parent_terms_pk").split(",")
-                ]
+                parent_term.strip().replace(" ", chr(127))
+                for parent_term in match.group("parent_terms_pk").split(",")
             )
-        if match.group("type_tiny") == "PN":
+        if type_tiny == "PN":
             return " ".join(
-                [
-                    re.sub(
-                        " ",
-                        chr(127),
-                        "{}:{}".format(
-                            match.group("entity_code_pn"), parent_term.strip()
-                        )
-                        if include_entity_codes
-                        else "{}".format(parent_term.strip()),
-                    )
-                    for parent_term in match.group("parent_terms_pn").split(",")
-                ]
+                (
+                    "{}:{}".format(match.group("entity_code_pn"), parent_term.strip())
+                    if include_entity_codes
+                    else parent_term.strip()
+                ).replace(" ", chr(127))
+                for parent_term in match.group("parent_terms_pn").split(",")
             )
 
-    cleaned_text = annotated_text.strip()
-    cleaned_text = re.sub(r"(?m)\s+", " ", cleaned_text)
-    cleaned_text = mask_annotations(cleaned_text)
-    cleaned_text = re.sub(r"([.,?!<>\[\]\|\"\(\)\+\-])", "", cleaned_text)
-    cleaned_text = unmask_annotations(cleaned_text)
-    cleaned_text = re.sub(
-        ANNOTATION_REGEX, lambda match: relevant_terms_from_match(match), cleaned_text
+    # normalize whitespace
+    cleaned_text = " ".join(annotated_text.split())
+
+    # remove punctuation outside of annotations and replace annotations with their terms
+    pieces = []
+    position = 0
+    for match in ANNOTATION_REGEX.finditer(cleaned_text):
+        pieces.append(
+            cleaned_text[position : match.start()].translate(
+                TERM_DISTRIBUTION_PUNCTUATION_REMOVAL_TABLE
+            )
+        )
+        pieces.append(relevant_terms_from_match(match))
+        position = match.end()
+    pieces.append(
+        cleaned_text[position:].translate(TERM_DISTRIBUTION_PUNCTUATION_REMOVAL_TABLE)
     )
-    result = {}
-    for term in cleaned_text.split(" "):
-        term = re.sub(chr(127), " ", term)
-        if re.match(r"^\d+$", term):
+
+    # yield the relevant terms
+    blacklist_terms = set(blacklist_terms)
+    for term in "".join(pieces).split(" "):
+        term = term.replace(chr(127), " ")
+        if term.isdecimal():
             continue
         if term in blacklist_terms:
             continue
-        if term not in result:
-            result[term] = 0
-        result[term] += 1
-    return result
+        yield term
 
 
-def compute_term_distribution_from_column(
-    pandas_series, blacklist_terms=[], include_entity_codes=True
+def compute_term_distribution_from_text(
+    annotated_text, blacklist_terms=[], include_entity_codes=True
 ):
-    """ Computes the distribution over all terms in the specified text column."""
+    """ Computes all terms and their frequencies from the specified text."""
 
-    distribution_candidate = pandas_series.map(
-        lambda text: compute_term_distribution_from_text(
-            text, blacklist_terms, include_entity_codes
-        )
-    ).agg(
-        lambda series: reduce(
-            lambda dist1, dist2: merge_dict_sum_numbers(dist1, dist2), series
+    return dict(
+        Counter(
+            generate_terms_for_term_distribution(
+                annotated_text, blacklist_terms, include_entity_codes
+            )
         )
     )
-    return (
-        distribution_candidate
-        if not isinstance(distribution_candidate, pd.Series)
-        else {}
-    )
+
+
+def compute_term_distribution_from_column(
+    pandas_series, blacklist_terms=[], include_entity_codes=True, distribution=None
+):
+    """ Computes the distribution over all terms in the specified text column.
+
+    To compute the distribution over several chunks of a column, pass the distribution of the previous chunks as distribution.
+    """
+
+    # note: the terms of large columns are counted in parallel, per chunk of texts.
+    #       the counting is done with a Counter but a dict is returned.
+    result = distribution if distribution is not None else Counter()
+    for chunk_distribution in map_chunks_in_parallel(
+        partial(
+            compute_term_distribution_from_texts,
+            blacklist_terms=blacklist_terms,
+            include_entity_codes=include_entity_codes,
+        ),
+        pandas_series,
+    ):
+        add_dict_numbers(result, chunk_distribution)
+    return dict(result) if distribution is None else result
+
+
+def compute_term_distribution_from_texts(
+    annotated_texts, blacklist_terms=[], include_entity_codes=True
+):
+    """ Computes all terms and their frequencies from the specified texts."""
+
+    result = Counter()
+    for annotated_text in annotated_texts:
+        result.update(
+            generate_terms_for_term_distribution(
+                annotated_text, blacklist_terms, include_entity_codes
+            )
+        )
+    return result
 
 
 def replace_from_to(text, start_position, end_position, new_text):
@@ -541,11 +911,107 @@ def add_parented_named_entity(
 def annotate_text(text, annotations):
     """ Annotates the given text with the given annotations."""
 
-    # sort all annotations to make the algorithm below work
+    # sort all annotations to make the algorithms below work
     sorted_annotations = sorted(
         annotations, key=lambda annotation: int(annotation["start_gross"])
     )
 
+    # build the annotated text in a single pass if possible
+    # note: the single pass covers the usual case, ie. a text without annotations yet.
+    #       otherwise, we fall back to adding the annotations one by one.
+    if is_single_pass_annotation_possible(text, sorted_annotations):
+        return annotate_text_in_single_pass(text, sorted_annotations)
+    else:
+        return annotate_text_incrementally(text, sorted_annotations)
+
+
+def is_single_pass_annotation_possible(text, sorted_annotations):
+    """ Checks if the given text can be annotated in a single pass with the given annotations."""
+
+    if "`" in text:
+        return False
+    for annotation in sorted_annotations:
+        if annotation["type"] not in ANNOTATION_TYPES:
+            continue
+        if not (
+            0 <= int(annotation["start_net"]) <= int(annotation["end_net"]) <= len(text)
+        ):
+            return False
+        if "`" in str(annotation.get("entity_code", "")) or "`" in str(
+            annotation.get("parent_terms", "")
+        ):
+            return False
+    return True
+
+
+def annotate_text_in_single_pass(text, sorted_annotations):
+    """ Annotates the given text (without annotations) with the given annotations (sorted by start_gross) by building the result in a single pass.
+
+    The result is the same as if the annotations were added one by one, see annotate_text_incrementally.
+    """
+
+    # find the annotations to add and where to add them
+    # note: the annotated text is not built before the end. instead, we keep track of
+    #       the gross positions of the added annotations, ie. the positions they would
+    #       have if the annotations were added one by one. this way, we can skip the
+    #       same annotations (overlaps) as if the annotations were added one by one.
+    added_starts_gross = []
+    added_ends_gross = []
+    added_growths = []
+    added_pieces = []
+    shift = 0
+    for annotation in sorted_annotations:
+        if annotation["type"] not in ANNOTATION_TYPES:
+            continue
+        start_gross = shift + int(annotation["start_net"])
+        end_gross = shift + int(annotation["end_net"])
+
+        # skip the annotation if it overlaps with or touches an added annotation
+        # note: this is the same condition as in has_annotation_within_range
+        index = bisect_left(added_ends_gross, start_gross)
+        if index < len(added_ends_gross) and added_starts_gross[index] <= max(
+            start_gross, end_gross
+        ):
+            continue
+
+        # get the annotation's positions in the original text and its markup
+        growth_before = sum(added_growths[:index])
+        start = start_gross - growth_before
+        end = end_gross - growth_before
+        markup = get_annotation_markup(
+            text[start:end],
+            annotation["type"],
+            annotation["entity_code"] if "named_entity" in annotation["type"] else None,
+            annotation["parent_terms"] if "parented" in annotation["type"] else None,
+        )
+        growth = len(markup) - (end - start)
+
+        # remember the annotation and move the subsequent annotations accordingly
+        for subsequent_index in range(index, len(added_starts_gross)):
+            added_starts_gross[subsequent_index] += growth
+            added_ends_gross[subsequent_index] += growth
+        added_starts_gross.insert(index, start_gross)
+        added_ends_gross.insert(index, start_gross + len(markup))
+        added_growths.insert(index, growth)
+        added_pieces.insert(index, (start, end, markup))
+        shift += growth
+
+    # assemble the annotated text
+    result_pieces = []
+    position = 0
+    for (start, end, markup) in added_pieces:
+        result_pieces.append(text[position:start])
+        result_pieces.append(markup)
+        position = end
+    result_pieces.append(text[position:])
+
+    # return the result
+    return "".join(result_pieces)
+
+
+def annotate_text_incrementally(text, sorted_annotations):
+    """ Annotates the given text with the given annotations (sorted by start_gross) by adding the annotations one by one."""
+
     # iterate through all (sorted) annotations and add the annotations to the text
     shift = 0
     for annotation in sorted_annotations:
@@ -583,6 +1049,191 @@ def annotate_text(text, annotations):
     return text
 
 
+def get_annotation_markup(term, annotation_type, entity_code=None, parent_terms=None):
+    """ Returns the inline markup for an annotation of the given type."""
+    if annotation_type == "standalone_key_term":
+        return "`{}``SK`´".format(term)
+    if annotation_type == "parented_key_term":
+        return "`{}``PK``{}`´".format(term, parent_terms)
+    if annotation_type == "standalone_named_entity":
+        return "`{}``SN``{}`´".format(term, entity_code)
+    if annotation_type == "parented_named_entity":
+        return "`{}``PN``{}``{}`´".format(term, entity_code, parent_terms)
+    raise ValueError(
+        "Annotation type '{}' is not supported. Valid types are: {}.".format(
+            annotation_type, ", ".join(ANNOTATION_TYPES)
+        )
+    )
+
+
+def convert_annotated_text_to_standoff(annotated_text):
+    """ Converts an annotated text (inline markup) into its plain text and its standoff annotations.
+
+    Standoff annotations are a list of spans [start_net, end_net, type_tiny, entity_code, parent_terms_raw]
+    whereby entity_code and parent_terms_raw are None if they do not apply to the annotation's type.
+    """
+
+    return (
+        remove_all_annotations_from_text(annotated_text),
+        [
+            [
+                annotation.start_net,
+                annotation.end_net,
+                LONG_TO_TINY_ANNOTATION_TYPE_MAPPING[annotation.type],
+                annotation.entity_code,
+                annotation.parent_terms_raw,
+            ]
+            for annotation in extract_annotations_as_generator(annotated_text)
+        ],
+    )
+
+
+def convert_standoff_to_annotated_text(plain_text, standoff_annotations):
+    """ Converts a plain text and its standoff annotations (see convert_annotated_text_to_standoff) into an annotated text (inline markup)."""
+
+    pieces = []
+    position = 0
+    for (start_net, end_net, type_tiny, entity_code, parent_terms_raw) in sorted(
+        standoff_annotations, key=lambda span: span[0]
+    ):
+        pieces.append(plain_text[position:start_net])
+        pieces.append(
+            get_annotation_markup(
+                plain_text[start_net:end_net],
+                TINY_TO_LONG_ANNOTATION_TYPE_MAPPING[type_tiny],
+                entity_code,
+                parent_terms_raw,
+            )
+        )
+        position = end_net
+    pieces.append(plain_text[position:])
+    return "".join(pieces)
+
+
+def convert_markup_to_standoff_annotation(annotation_markup, start_net, end_net):
+    """ Converts the markup of a single annotation (eg. `term``SK`´) into a standoff annotation (see convert_annotated_text_to_standoff) at the given position."""
+    annotation = next(extract_annotations_as_generator(annotation_markup))
+    return [
+        start_net,
+        end_net,
+        LONG_TO_TINY_ANNOTATION_TYPE_MAPPING[annotation.type],
+        annotation.entity_code,
+        annotation.parent_terms_raw,
+    ]
+
+
+def remove_overlapping_standoff_annotations(standoff_annotations):
+    """ Returns the given standoff annotations without those which overlap with a preceding one (in the sequence given), sorted by position."""
+    kept_starts = []
+    kept_annotations = []
+    for standoff_annotation in standoff_annotations:
+        start_net, end_net = standoff_annotation[0], standoff_annotation[1]
+        index = bisect_left(kept_starts, start_net)
+        if index > 0 and kept_annotations[index - 1][1] > start_net:
+            continue
+        if index < len(kept_starts) and kept_starts[index] < end_net:
+            continue
+        if index < len(kept_starts) and kept_starts[index] == start_net:
+            continue
+        kept_starts.insert(index, start_net)
+        kept_annotations.insert(index, standoff_annotation)
+    return kept_annotations
+
+
+def extract_annotations_from_standoff(
+    plain_text,
+    standoff_annotations,
+    types_to_extract=None,
+    entity_codes_to_extract=None,
+):
+    """ Yields the annotations (Annotation records) of a plain text with the given standoff annotations, without generating and parsing the annotated text.
+
+    The gross positions are the positions the annotations would have in the annotated text.
+    """
+
+    markup_length_so_far = 0
+    for (start_net, end_net, type_tiny, entity_code, parent_terms_raw) in sorted(
+        standoff_annotations, key=lambda span: span[0]
+    ):
+        # compute the gross positions
+        # note: like in parse_annotations, this needs to happen before any filtering
+        annotation_type = TINY_TO_LONG_ANNOTATION_TYPE_MAPPING[type_tiny]
+        term = plain_text[start_net:end_net]
+        markup_length = len(
+            get_annotation_markup(term, annotation_type, entity_code, parent_terms_raw)
+        )
+        start_gross = start_net + markup_length_so_far
+        markup_length_so_far += markup_length - len(term)
+
+        # filter and yield the annotation
+        if types_to_extract is not None and annotation_type not in types_to_extract:
+            continue
+        if (
+            entity_code is not None
+            and entity_codes_to_extract is not None
+            and entity_code not in entity_codes_to_extract
+        ):
+            continue
+        yield Annotation(
+            term,
+            annotation_type,
+            sys.intern(entity_code) if entity_code is not None else None,
+            parent_terms_raw,
+            extract_normalized_parent_terms(parent_terms_raw)
+            if parent_terms_raw is not None
+            else None,
+            start_net,
+            end_net,
+            start_gross,
+            start_gross + markup_length,
+        )
+
+
+def serialize_standoff_annotations(standoff_annotations):
+    """ Serializes standoff annotations into a compact JSON string, eg. to store them in a dataset column."""
+    return json.dumps(standoff_annotations, ensure_ascii=False, separators=(",", ":"))
+
+
+def deserialize_standoff_annotations(serialized_standoff_annotations):
+    """ Deserializes standoff annotations which were serialized by serialize_standoff_annotations. Empty values give an empty list."""
+    if not serialized_standoff_annotations:
+        return []
+    if isinstance(serialized_standoff_annotations, list):
+        return serialized_standoff_annotations
+    return json.loads(serialized_standoff_annotations)
+
+
+def compute_named_entities_distribution_from_standoff(standoff_annotations):
+    """ Computes the types and frequencies of named entities from the given (serialized) standoff annotations."""
+    return dict(
+        Counter(
+            entity_code
+            for (_, _, type_tiny, entity_code, _) in deserialize_standoff_annotations(
+                standoff_annotations
+            )
+            if type_tiny in ["SN", "PN"]
+        )
+    )
+
+
+def compute_named_entities_distribution_from_standoff_column(
+    standoff_annotations_column, distribution=None
+):
+    """ Computes the distribution over all named entities in the specified column of (serialized) standoff annotations.
+
+    To compute the distribution over several chunks of a column, pass the distribution of the previous chunks as distribution.
+    """
+
+    # note: the counting is done with a Counter but a dict is returned
+    result = distribution if distribution is not None else Counter()
+    for standoff_annotations in standoff_annotations_column:
+        add_dict_numbers(
+            result,
+            compute_named_entities_distribution_from_standoff(standoff_annotations),
+        )
+    return dict(result) if distribution is None else result
+
+
 def normalize_labels_values(pandas_series):
     """Normalizes the labels in the passed column so multiple label columns can be compared."""
     return pandas_series.map(lambda labels: "|".join(sorted(labels.split("|"))))